@@ -0,0 +1,67 @@
+"""
+Size of the parsing tree against the compact abstract syntax tree.
+
+Usage: python -m benchmarks.bench_ast [classes]
+"""
+import sys
+import time
+import tracemalloc
+
+from benchmarks.corpus import generate_program
+from src.gramatica import get_grammar, get_terminal_list
+from src.parser import Parser
+from src.scanner import scan_program
+from src.semantic import get_symbol_table
+from src.syntax_tree import build_ast, collect_declarations, count_nodes
+
+
+def count_tree_nodes(root) -> int:
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def build(function) -> tuple[object, float, int]:
+    """
+    Runs a tree builder and returns the tree, the elapsed time in seconds and the memory it keeps in bytes.
+    The time is measured on a separate run, because tracing slows down the allocations.
+    """
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    tree = function()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return tree, elapsed, size
+
+
+def main(argv: list[str]) -> None:
+    classes = int(argv[1]) if len(argv) > 1 else 2000
+    program = generate_program(classes)
+    grammar = get_grammar()
+    tokens = scan_program(program)
+    tokens.locate()
+    print(f"Program: {classes} classes, {len(tokens)} tokens")
+
+    def read_tree():
+        return Parser(grammar, tokens, next(iter(grammar)), get_terminal_list()).read_descent()
+
+    tree, tree_time, tree_memory = build(read_tree)
+    ast, ast_time, ast_memory = build(lambda: build_ast(tokens))
+    if get_symbol_table(tree) != collect_declarations(ast):
+        raise Exception("The parsing tree and the abstract syntax tree have different declarations")
+
+    tree_nodes = count_tree_nodes(tree)
+    ast_nodes = count_nodes(ast)
+    print(f"Parsing tree: {tree_nodes} nodes, {tree_memory / (1024 * 1024):.1f} MB, {tree_time:.3f} s")
+    print(f"    AST:      {ast_nodes} nodes, {ast_memory / (1024 * 1024):.1f} MB, {ast_time:.3f} s")
+    print(f"  {tree_nodes / ast_nodes:.1f}x fewer nodes, {tree_memory / ast_memory:.1f}x less memory")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
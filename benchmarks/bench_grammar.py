@@ -0,0 +1,102 @@
+"""
+First/Follow construction benchmark on a synthetic grammar.
+
+Usage: python -m benchmarks.bench_grammar [non-terminals]
+"""
+import sys
+import time
+
+from src.parser import BASE_CHAR, Parser
+
+TERMINALS = 50
+
+
+def generate_grammar(size: int) -> tuple[dict[str, list[list[str]]], set[str]]:
+    """
+    Generates an LL-like grammar where each non-terminal starts with the next one.
+    Information flows against the order of the rules, which is the worst case for repeated sweeps.
+    :param size: The number of non-terminals.
+    :return: The grammar and its terminals.
+    """
+    terminals = {f"t{index}" for index in range(TERMINALS)}
+    ebnf = {}
+    for index in range(size):
+        following = f"<N{index + 1}>" if index + 1 < size else f"t{index % TERMINALS}"
+        productions = [
+            [f"t{index % TERMINALS}", following],
+            [following, f"<N{(index * 7) % size}>", f"t{(index * 3) % TERMINALS}"],
+        ]
+        if index % 5 == 0:
+            productions.append([])
+        ebnf[f"<N{index}>"] = productions
+    return ebnf, terminals
+
+
+def fixed_point_sets(ebnf: dict[str, list[list[str]]], start: str) -> tuple[dict, dict]:
+    """
+    Reference First/Follow computation that sweeps every production until nothing changes.
+    """
+    first = {non_terminal: set() for non_terminal in ebnf}
+
+    def sequence_first(sequence: list[str]) -> set[str | None]:
+        result = set()
+        for token in sequence:
+            token_first = first[token] if token in ebnf else {token}
+            result |= token_first - {None}
+            if None not in token_first:
+                return result
+        return result | {None}
+
+    changed = True
+    while changed:
+        changed = False
+        for non_terminal, productions in ebnf.items():
+            for production in productions:
+                new = sequence_first(production)
+                if not new <= first[non_terminal]:
+                    first[non_terminal] |= new
+                    changed = True
+
+    follow = {non_terminal: set() for non_terminal in ebnf}
+    follow[start].add(BASE_CHAR)
+    changed = True
+    while changed:
+        changed = False
+        for non_terminal, productions in ebnf.items():
+            for production in productions:
+                for i, token in enumerate(production):
+                    if token in ebnf:
+                        rest = sequence_first(production[i + 1:])
+                        new = rest - {None}
+                        if None in rest:
+                            new |= follow[non_terminal]
+                        if not new <= follow[token]:
+                            follow[token] |= new
+                            changed = True
+    return first, follow
+
+
+def main(argv: list[str]) -> None:
+    size = int(argv[1]) if len(argv) > 1 else 1000
+    ebnf, terminals = generate_grammar(size)
+    start = next(iter(ebnf))
+    parser = Parser(ebnf, [], start, terminals)
+    print(f"Grammar: {size} non-terminals, {sum(map(len, ebnf.values()))} productions, {len(terminals)} terminals")
+
+    begin = time.perf_counter()
+    parser.create_first()
+    parser.create_follow()
+    graph = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    first, follow = fixed_point_sets(ebnf, start)
+    sweeps = time.perf_counter() - begin
+
+    if any(first[non_terminal] != parser.first[non_terminal] for non_terminal in ebnf) or follow != parser.follow:
+        raise Exception("The graph and the fixed-point sets are different")
+    print(f"   graph: {graph:.3f} s")
+    print(f"  sweeps: {sweeps:.3f} s  ({sweeps / graph:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,64 @@
+"""
+Latency of reparsing a program after small edits, incrementally and from scratch.
+
+Usage: python -m benchmarks.bench_incremental [lines]
+"""
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import generate_program_of_lines
+from src.gramatica import EBNF, TERMINAL_LIST
+from src.incremental import IncrementalParser
+from src.parser import Parser
+from src.scanner import scan_program
+
+
+def same_tree(tree, expected) -> bool:
+    stack = [(tree, expected)]
+    while stack:
+        node, other = stack.pop()
+        if (node.token.value, node.token.type_, node.line, node.column) != \
+                (other.token.value, other.token.type_, other.line, other.column) \
+                or len(node.children) != len(other.children):
+            return False
+        stack.extend(zip(node.children, other.children))
+    return True
+
+
+def main(argv: list[str]) -> None:
+    lines = int(argv[1]) if len(argv) > 1 else 50000
+    source = generate_program_of_lines(lines)
+    middle = len(source) // 2
+    # A digit of a statement, a new line between two statements and a new statement, all in the middle class
+    digit = source.index("1;", middle)
+    statement = source.index("i = 0;", middle) + len("i = 0;")
+    edits = [
+        ("one character", digit, 1, "2"),
+        ("new line", statement, 0, "\n"),
+        ("new statement", statement, 0, " total = 3;"),
+    ]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        tokens = scan_program(source)
+        print(f"Program: {source.count(chr(10))} lines, {len(tokens)} tokens")
+        start = time.perf_counter()
+        incremental = IncrementalParser(Parser(EBNF, tokens, next(iter(EBNF)), TERMINAL_LIST, cache_dir))
+        print(f"  initial parse: {time.perf_counter() - start:.3f} s")
+
+        for name, offset, removed, inserted in edits:
+            start = time.perf_counter()
+            tree = incremental.edit(offset, removed, inserted)
+            elapsed = time.perf_counter() - start
+            source = source[:offset] + inserted + source[offset + removed:]
+
+            start = time.perf_counter()
+            expected = Parser(EBNF, scan_program(source), next(iter(EBNF)), TERMINAL_LIST, cache_dir).read_descent()
+            full = time.perf_counter() - start
+            if not same_tree(tree.root(), expected):
+                raise Exception(f"The tree after the {name} edit is different from a full parse")
+            print(f"{name:>15}: incremental {elapsed * 1000:8.1f} ms  full {full * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,46 @@
+"""
+Parallel parsing of the classes of a program against the sequential flat parser.
+
+Usage: python -m benchmarks.bench_parallel [classes] [workers ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import generate_program
+from src.flat_tree import read_flat
+from src.gramatica import EBNF, TERMINAL_LIST
+from src.parallel import read_parallel
+from src.parser import Parser
+from src.scanner import scan_program
+
+
+def main(argv: list[str]) -> None:
+    classes = int(argv[1]) if len(argv) > 1 else 4000
+    worker_counts = [int(arg) for arg in argv[2:]] or sorted({1, 2, os.cpu_count() or 1})
+    tokens = scan_program(generate_program(classes))
+    tokens.locate()
+    print(f"Program: {classes} classes, {len(tokens)} tokens, {os.cpu_count()} processors")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        start = time.perf_counter()
+        expected = read_flat(Parser(EBNF, tokens, next(iter(EBNF)), TERMINAL_LIST, cache_dir))
+        sequential = time.perf_counter() - start
+        print(f"  sequential: {sequential:.3f} s")
+
+        for workers in worker_counts:
+            parser = Parser(EBNF, tokens, next(iter(EBNF)), TERMINAL_LIST, cache_dir)
+            start = time.perf_counter()
+            tree = read_parallel(parser, workers)
+            elapsed = time.perf_counter() - start
+            if tree is None or any(
+                    getattr(tree, name) != getattr(expected, name)
+                    for name in ("kinds", "token_indices", "first_child", "next_sibling")
+            ):
+                raise Exception("The parallel tree is different from the sequential one")
+            print(f"{workers:>3} workers: {elapsed:.3f} s  ({sequential / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,38 @@
+"""
+Parser benchmark: table driver and generated recursive-descent parser.
+The time per token should stay flat as the input grows.
+
+Usage: python -m benchmarks.bench_parser [max tokens]
+"""
+import sys
+import time
+
+from benchmarks.corpus import generate_program
+from src.gramatica import EBNF, TERMINAL_LIST
+from src.parser import Parser
+from src.scanner import scan_program
+
+# Tokens of each generated class, used to size the inputs
+TOKENS_PER_CLASS = 142
+
+
+def main(argv: list[str]) -> None:
+    max_tokens = int(argv[1]) if len(argv) > 1 else 1_000_000
+    print(f"Recursion limit: {sys.getrecursionlimit()}")
+    size = max_tokens
+    sizes = []
+    while size >= 100_000:
+        sizes.append(size)
+        size //= 2
+    for size in reversed(sizes):
+        tokens = scan_program(generate_program(size // TOKENS_PER_CLASS))
+        for name in ("read", "read_descent"):
+            parser = Parser(EBNF, tokens, next(iter(EBNF)), TERMINAL_LIST)
+            start = time.perf_counter()
+            getattr(parser, name)()
+            elapsed = time.perf_counter() - start
+            print(f"{len(tokens):>9} tokens, {name:>12}: {elapsed:.3f} s  {elapsed / len(tokens) * 1e6:.2f} us/token")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
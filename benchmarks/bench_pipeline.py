@@ -0,0 +1,88 @@
+"""
+Timing of the compiler stages with the default options.
+The "graphs" column is the work every run did before the anytree graphs were only built for -g:
+a graph of the parsing tree walked with RenderTree, and a graph of the semantic tree.
+
+Usage: python -m benchmarks.bench_pipeline [classes ...]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import anytree as at
+
+from benchmarks.corpus import generate_program
+from src.code_generator_heap import write_code_to_file
+from src.gramatica import get_grammar, get_terminal_list
+from src.options import Options
+from src.parser import Node, node_color, parse
+from src.scanner import scan
+from src.semantic import analyze_semantics
+
+
+def create_graph(node: Node) -> at.Node:
+    """
+    Wraps a tree in anytree nodes, as parse() and analyze_semantics() used to on every run.
+    """
+    root = None
+    stack = [(node, None)]
+    while stack:
+        node, parent = stack.pop()
+        graph_node = at.Node(node, parent, color=node_color(node))
+        if root is None:
+            root = graph_node
+        for child in reversed(node.children):
+            stack.append((child, graph_node))
+    return root
+
+
+def run(files_dir: str) -> dict[str, float]:
+    """
+    Compiles program.java of a directory like main.py and returns the time of each stage in seconds.
+    """
+    options = Options(["main.py"], files_dir)
+    times = {}
+    # The stages print the symbol table and progress messages
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        tokens = scan(options)
+        times["scan"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tree = parse(options, get_grammar(), get_terminal_list(), tokens)
+        times["parse"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        symbol_table, semantic_tree = analyze_semantics(options, tree)
+        times["semantic"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        write_code_to_file(options, symbol_table, semantic_tree)
+        times["code"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in at.RenderTree(create_graph(tree)):
+        pass
+    create_graph(semantic_tree)
+    times["graphs"] = time.perf_counter() - start
+    return times
+
+
+def main(argv: list[str]) -> None:
+    sizes = [int(arg) for arg in argv[1:]] or [50, 100, 200]
+    with tempfile.TemporaryDirectory() as directory:
+        files_dir = directory + os.sep
+        for classes in sizes:
+            with open(f"{files_dir}program.java", "w") as f:
+                f.write(generate_program(classes))
+            times = run(files_dir)
+            stages = "  ".join(f"{stage} {elapsed:.3f} s" for stage, elapsed in times.items())
+            total = sum(times.values()) - times["graphs"]
+            print(f"{classes:>6} classes: {stages}  total {total:.3f} s (with the graphs {total + times['graphs']:.3f} s)")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,96 @@
+"""
+Scanner throughput benchmark.
+
+Usage: python -m benchmarks.bench_scanner [size in MB]
+"""
+import io
+import sys
+import time
+import tracemalloc
+
+from benchmarks.corpus import generate_program_of_size
+from benchmarks.legacy_scanner import parse_program_legacy
+from src.scanner import parse_program, parse_stream, scan_bytes, scan_program, scan_program_regex
+
+
+def measure(functions: dict, program: str, repeat: int = 5) -> dict[str, float]:
+    """
+    Runs scanner functions over a program and returns the best CPU time of each in seconds.
+    The functions take turns, so a slow spell of the machine does not fall on a single one.
+    """
+    best = dict.fromkeys(functions, float("inf"))
+    for _ in range(repeat):
+        for name, function in functions.items():
+            start = time.process_time()
+            function(program)
+            best[name] = min(best[name], time.process_time() - start)
+    return best
+
+
+def peak_memory(function, program) -> int:
+    """
+    Runs a scanner function over a program and returns the peak of allocated memory in bytes.
+    """
+    tracemalloc.start()
+    function(program)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main(argv: list[str]) -> None:
+    size_mb = float(argv[1]) if len(argv) > 1 else 4
+    program = generate_program_of_size(int(size_mb * 1024 * 1024))
+    size = len(program) / (1024 * 1024)
+
+    tokens = parse_program(program)
+    if tokens != parse_program_legacy(program):
+        raise Exception("The scanners produced different token lists")
+
+    data = program.encode("ascii")
+    # Trailing blanks once made the regex backend quadratic
+    for source in (program, program + " \n\t" * 10000):
+        expected = list(scan_program(source))
+        if list(scan_program_regex(source)) != expected:
+            raise Exception("The regex scanner produced a different token list")
+        if scan_bytes(source.encode("ascii")).tuples() != expected:
+            raise Exception("The bytes scanner produced a different token list")
+
+    print(f"Program: {size:.2f} MB, {len(tokens)} tokens")
+    backends = {
+        "legacy": parse_program_legacy,
+        "dfa": scan_program,
+        "regex": scan_program_regex,
+        "bytes": lambda source: scan_bytes(data),
+        "tuples": parse_program,
+        "stream": lambda source: list(parse_stream(io.StringIO(source))),
+    }
+    times = measure(backends, program)
+    for name, elapsed in times.items():
+        print(f"{name:>8}: {elapsed:.3f} s  {size / elapsed:.2f} MB/s")
+    # parse_program replaced parse_program_legacy, so it must stay faster than it
+    print(f"  tuples: {times['legacy'] / times['tuples']:.2f}x the speed of legacy")
+
+    str_peak = peak_memory(scan_program, program)
+    bytes_peak = peak_memory(scan_bytes, data)
+    view_peak = peak_memory(scan_bytes, memoryview(data))
+    print(f"Peak memory: {str_peak / (1024 * 1024):.1f} MB from str, {bytes_peak / (1024 * 1024):.1f} MB from bytes, "
+          f"{view_peak / (1024 * 1024):.1f} MB from a memoryview")
+
+    stream = scan_program(program)
+    start = time.perf_counter()
+    stream.locate()
+    elapsed = time.perf_counter() - start
+    print(f"  locate: {elapsed:.3f} s  (lines and columns of every token)")
+
+    buffers = (stream.kinds, stream.starts, stream.ends, stream.lines, stream.columns)
+    stream_bytes = sum(buffer.itemsize * len(buffer) for buffer in buffers)
+    tuple_bytes = sys.getsizeof(tokens) + sum(
+        sys.getsizeof(token) + sys.getsizeof(token[0]) for token in tokens if token[0] is not token[1])
+    tuple_bytes += sum(sys.getsizeof(token) for token in tokens if token[0] is token[1])
+    print(f"Token memory: {tuple_bytes / len(tokens):.1f} bytes/token as tuples, "
+          f"{stream_bytes / len(stream):.1f} bytes/token as TokenStream")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
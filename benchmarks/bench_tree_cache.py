@@ -0,0 +1,59 @@
+"""
+Store and load throughput of cached parsing trees against a fresh parse.
+
+Usage: python -m benchmarks.bench_tree_cache [classes ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import generate_program
+from src.flat_tree import load_tree, read_flat, save_tree, tree_cache_path
+from src.gramatica import EBNF, TERMINAL_LIST
+from src.parser import Parser
+from src.scanner import scan_program
+
+
+def main(argv: list[str]) -> None:
+    sizes = [int(arg) for arg in argv[1:]] or [500, 2000]
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for classes in sizes:
+            tokens = scan_program(generate_program(classes))
+            tokens.locate()
+
+            start = time.perf_counter()
+            Parser(EBNF, tokens, next(iter(EBNF)), TERMINAL_LIST, cache_dir).read_descent()
+            descent = time.perf_counter() - start
+
+            parser = Parser(EBNF, tokens, next(iter(EBNF)), TERMINAL_LIST, cache_dir)
+            start = time.perf_counter()
+            tree = read_flat(parser)
+            flat = time.perf_counter() - start
+
+            start = time.perf_counter()
+            path = tree_cache_path(cache_dir, parser)
+            key = time.perf_counter() - start
+
+            start = time.perf_counter()
+            save_tree(tree, path)
+            store = time.perf_counter() - start
+
+            start = time.perf_counter()
+            loaded = load_tree(path, tokens)
+            load = time.perf_counter() - start
+            if loaded is None or any(
+                    getattr(loaded, name) != getattr(tree, name)
+                    for name in ("kinds", "token_indices", "first_child", "next_sibling")
+            ):
+                raise Exception("The loaded tree is different from the stored one")
+
+            size = os.path.getsize(path) / 2 ** 20
+            print(f"{classes:>6} classes, {len(tree)} nodes, {size:.1f} MB:")
+            print(f"    parse: descent {descent:.3f} s  flat {flat:.3f} s")
+            print(f"    key {key:.3f} s  store {store:.3f} s ({size / store:.0f} MB/s)  "
+                  f"load {load:.3f} s ({size / load:.0f} MB/s)  hit {(key + load):.3f} s")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,99 @@
+"""
+Memory used by the parsing tree.
+The unslotted classes are the Token and Node of the parser before they had slots and shared tokens,
+so the tree read with them is the baseline of the slotted tree.
+
+Usage: python -m benchmarks.bench_tree_memory [lines]
+"""
+import sys
+import tracemalloc
+
+from benchmarks.corpus import generate_program_of_lines
+from src.gramatica import get_grammar, get_terminal_list
+from src.flat_tree import read_flat
+from src.parser import Parser
+from src.scanner import scan_program
+
+
+class UnslottedToken:
+    def __init__(self, value: str, type_: str) -> None:
+        self.type_ = type_
+        self.value = value
+
+
+class UnslottedNode:
+    def __init__(self, token: UnslottedToken, children=None, line: int | None = None, column: int | None = None):
+        self.token = token
+        self.children = children if children is not None else []
+        self.line = line
+        self.column = column
+
+
+def unslotted_copy(root):
+    """
+    Copies a tree into unslotted nodes, each with its own token and children list, as the parser used to build it.
+    """
+    copy = UnslottedNode(UnslottedToken(root.token.value, root.token.type_), None, root.line, root.column)
+    stack = [(root, copy)]
+    while stack:
+        node, node_copy = stack.pop()
+        for child in node.children:
+            child_copy = UnslottedNode(UnslottedToken(child.token.value, child.token.type_), None, child.line, child.column)
+            node_copy.children.append(child_copy)
+            stack.append((child, child_copy))
+    return copy
+
+
+def count_nodes(root) -> int:
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def main(argv: list[str]) -> None:
+    lines = int(argv[1]) if len(argv) > 1 else 100_000
+    program = generate_program_of_lines(lines)
+    grammar = get_grammar()
+    # Builds the tables and the generated parser before measuring
+    Parser(grammar, scan_program(generate_program_of_lines(1)), next(iter(grammar)), get_terminal_list()).read_descent()
+
+    tokens = scan_program(program)
+    tokens.locate()
+    nodes = None
+    for name, read in (("Node objects", Parser.read_descent), ("flat arrays", read_flat)):
+        parser = Parser(grammar, tokens, next(iter(grammar)), get_terminal_list())
+        tracemalloc.start()
+        tree = read(parser)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        if nodes is None:
+            nodes = count_nodes(tree)
+            print(f"Program: {program.count(chr(10))} lines, {len(tokens)} tokens, {nodes} nodes")
+        print(f"{name:>12}: {current / (1024 * 1024):.1f} MB ({current / nodes:.1f} bytes/node), "
+              f"peak {peak / (1024 * 1024):.1f} MB")
+
+        if read is Parser.read_descent:
+            tracemalloc.start()
+            copy = unslotted_copy(tree)
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{'unslotted':>12}: {current / (1024 * 1024):.1f} MB ({current / nodes:.1f} bytes/node), "
+                  f"peak {peak / (1024 * 1024):.1f} MB")
+            del copy
+        del tree
+
+    parser = Parser(grammar, tokens, next(iter(grammar)), get_terminal_list())
+    tracemalloc.start()
+    events = sum(1 for _ in parser.read_events())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{'events':>12}: {events} events, peak {peak / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
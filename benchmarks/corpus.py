@@ -0,0 +1,86 @@
+"""
+Synthetic MiniJava programs used by the benchmarks.
+
+The generated sources only use constructs that every scanner backend accepts
+and that parse without errors, so the same corpus can be fed to the scanner,
+the parser and the later stages.
+"""
+
+MAIN_CLASS = """class Main {
+    public static void main(String[] args) {
+        System.out.println(new Class0().run(1));
+    }
+}
+"""
+
+CLASS_TEMPLATE = """
+// Generated class {index}
+class Class{index} {
+    int total;
+    int[] values;
+    boolean flag;
+
+    /* Computes a value
+       from the input */
+    public int run(int num) {
+        int aux;
+        int i;
+        {
+            i = 0;
+            aux = num * {index} + 1;
+            values = new int[10];
+            while (i < 10 && flag) {
+                values[i] = aux - i;
+                System.out.println(values[i]);
+                i = i + 1;
+            }
+            if (aux < 100) {
+                total = this.step(aux, i);
+            }
+            else {
+                total = aux;
+            }
+        }
+        return total;
+    }
+
+    public int step(int a, int b) {
+        {
+            System . out . println(a + b * 2);
+        }
+        return a - b;
+    }
+}
+"""
+
+
+def generate_program(classes: int) -> str:
+    """
+    Generates a MiniJava program with the given number of classes.
+    :param classes: The number of classes after the main class.
+    :return: The program source.
+    """
+    parts = [MAIN_CLASS]
+    for index in range(classes):
+        parts.append(CLASS_TEMPLATE.replace("{index}", str(index)))
+    return "".join(parts)
+
+
+def generate_program_of_size(size: int) -> str:
+    """
+    Generates a MiniJava program of at least the given size in characters.
+    :param size: The minimum size of the program.
+    :return: The program source.
+    """
+    classes = max(1, size // len(CLASS_TEMPLATE) + 1)
+    return generate_program(classes)
+
+
+def generate_program_of_lines(lines: int) -> str:
+    """
+    Generates a MiniJava program of at least the given number of lines.
+    :param lines: The minimum number of lines of the program.
+    :return: The program source.
+    """
+    classes = max(1, (lines - MAIN_CLASS.count("\n")) // CLASS_TEMPLATE.count("\n") + 1)
+    return generate_program(classes)
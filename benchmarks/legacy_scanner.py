@@ -0,0 +1,96 @@
+"""
+The original scanner pipeline, which parse_program replaced.
+
+Kept unchanged, outside src/, as the reference that bench_scanner compares the
+current scanners against: the pre-processing passes rewrite the whole program
+before it is split into words, and every word is matched with re.match.
+"""
+import re
+from typing import List, Tuple
+
+from src.scanner import reserved_words, terminal_symbols
+
+
+def is_identifier(str) -> bool:
+    """
+    Checks if a string is an identifier.
+    :param str: The string to check.
+    :return: True if the string is an identifier, False otherwise.
+    """
+    return re.match(r"^[a-zA-Z][a-zA-Z0-9_]*$", str) is not None
+
+
+def is_integer_number(str) -> bool:
+    """
+    Checks if a string is an integer number.
+    :param str: The string to check.
+    :return: True if the string is an integer number, False otherwise.
+    """
+    return re.match(r"^[0-9]+$", str) is not None
+
+
+def remove_comments(string) -> str:
+    """
+    Removes comments from a string.
+    :param string: The string to remove comments from.
+    :return: The string without comments.
+    """
+    out_string = re.sub(r"//.*?$", "", string, flags=re.MULTILINE)
+    out_string = re.sub(r"/\*.*?\*/", "", out_string, flags=re.DOTALL)
+    return out_string
+
+
+def add_spaces(string) -> str:
+    """
+    Adds spaces around terminal symbols.
+    :param string: The string to add spaces to.
+    :return: The string with spaces around terminal symbols.
+    """
+    for symbol in terminal_symbols:
+        string = string.replace(symbol, f" {symbol} ")
+    return string
+
+
+def unify_println(string) -> str:
+    """
+    Unifies System.out.println into a single token.
+    :param string: The string to unify.
+    :return: The string with System.out.println unified.
+    """
+    out_string = re.sub(
+        r"System[\s\n\t\r\f]*\.[\s\n\t\r\f]*out[\s\n\t\r\f]*\.[\s\n\t\r\f]*println",
+        "System.out.println", string
+    )
+
+    return out_string
+
+
+def parse_program_legacy(program) -> List[Tuple[str, str]]:
+    """
+    Parses a program from a string using the original pre-processing passes.
+    :param string: The string to parse.
+    :return: The list of tokens sequentially. Throws an exception if a token is not recognized.
+    """
+
+    tokenList = []
+
+    # Pré-processamento
+    # Remove todos os comentários de linha
+    program = remove_comments(program)
+    program = add_spaces(program)
+    program = unify_println(program)
+
+    for word in program.split():
+        if word in reserved_words:
+            tokenList.append((word, word))
+        elif word in terminal_symbols:
+            tokenList.append((word, word))
+        elif is_identifier(word):
+            tokenList.append((word, "identifier"))
+        elif is_integer_number(word):
+            tokenList.append((word, "number"))
+        else:
+            raise Exception(
+                f"Não foi possível interpretar um token no programa: {word}")
+
+    return tokenList
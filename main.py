@@ -1,19 +1,41 @@
+import json
 import sys
 
 from src.gramatica import get_grammar, get_terminal_list
 from src.options import Options
 from src.scanner import scan
-from src.parser import parse
+from src.parser import check_syntax, parse
 from src.semantic import analyze_semantics
+from src.syntax_tree import build_ast, collect_declarations
 # from src.code_generator import generate_code
 from src.code_generator_heap import write_code_to_file
 
 
-options = Options(sys.argv, "files/")
+def main(argv: list[str]) -> None:
+    options = Options(argv, "files/")
 
-scan(options)
-sat = parse(options, get_grammar(), get_terminal_list())
+    tokens = scan(options)
 
-symbol_table, semantic_tree = analyze_semantics(options, sat)
+    if options.check:
+        errors = check_syntax(options, get_grammar(), get_terminal_list(), tokens)
+        for error in errors:
+            print(error)
+        sys.exit(1 if errors else 0)
 
-write_code_to_file(options, symbol_table, semantic_tree)
+    if options.ast:
+        # The semantic analysis and the code generator still read the parsing tree
+        if options.stream:
+            raise Exception("The abstract syntax tree is built from the tokens in memory, without --stream")
+        print(json.dumps(collect_declarations(build_ast(tokens)), indent=4))
+        sys.exit()
+
+    sat = parse(options, get_grammar(), get_terminal_list(), tokens)
+
+    symbol_table, semantic_tree = analyze_semantics(options, sat)
+
+    write_code_to_file(options, symbol_table, semantic_tree)
+
+
+# The worker processes of --parallel import this module again when they are spawned
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,288 @@
+"""
+Generates a recursive-descent parser from the compiled LL(1) table of a Parser.
+
+The generated module has one function per non-terminal, with the lookahead checks of its
+table row written out as set tests and the terminals of each production checked inline, so
+parsing interprets no table at runtime. It builds the same trees as Parser.read, including
+the AVANÇA/DESEMPILHA recovery nodes.
+
+The functions read a TokenStream through a local cursor. Productions that end with a
+non-terminal return that non-terminal's function instead of calling it, and their callers run
+the returned functions in a loop: long lists such as <LCMD> and <LCLASSE> are right-recursive,
+so they are parsed without nesting Python calls.
+"""
+import importlib.util
+import os
+import re
+import sys
+from types import ModuleType
+
+# Bumped whenever the generated code changes, so cached modules are regenerated
+GENERATOR_VERSION = 3
+
+HEADER = '''"""
+Recursive-descent parser generated by src/descent.py from the grammar in src/gramatica.py.
+Do not edit: it is regenerated whenever the grammar changes.
+"""
+from src.parser import BASE_CHAR, DESEMPILHA_TOKEN, EMPTY_TOKEN, NO_CHILDREN, Node, Token, at_position, leaf_token, shared_token
+
+GRAMMAR_HASH = {grammar_hash!r}
+'''
+
+PARSE_HEADER = '''
+
+def parse(parser):
+    """
+    Parses the TokenStream of a Parser and returns the parsing tree.
+    """
+    tokens = parser.tokens
+    count = len(tokens)
+    # Terminal id, line and column of every token, followed by the end of the input
+    ids = [parser.kind_map[kind] for kind in tokens.kinds]
+    ids.append(parser.base_id)
+    lines = tokens.lines.tolist()
+    lines.append(None)
+    columns = tokens.columns.tolist()
+    columns.append(None)
+    value = tokens.value
+    position = parser.position
+
+    def lookahead_type():
+        return tokens.type_(position) if position < count else BASE_CHAR
+
+    def match(children, terminal, name, add_to_graph=True):
+        """
+        Reads a terminal that is not the lookahead: reports the end of the input, or skips the
+        lookahead token (AVANÇA) until the terminal is found.
+        """
+        nonlocal position
+        while True:
+            line, column = lines[position], columns[position]
+            if ids[position] == terminal:
+                children.append(Node(leaf_token(value(position), name), NO_CHILDREN, line, column))
+                position += 1
+                return
+            if position == count:
+                children.append(Node(Token(f"Input ended while expecting '{name}'", "ERROR")))
+                return
+            child = Node(Token(value(position), "AVANÇA"), None, line, column)
+            position += 1
+            if add_to_graph:
+                children.append(Node(shared_token(name, name), [child], line, column))
+            else:
+                children.append(child)
+            children = child.children
+            add_to_graph = False
+
+    def run(rest):
+        """
+        Runs the functions returned by productions that end with a non-terminal.
+        """
+        while rest is not None:
+            rest = rest[0](rest[1])
+'''
+
+
+def function_name(non_terminal: str, used: set[str]) -> str:
+    """
+    Creates the name of the function of a non-terminal.
+    """
+    name = "parse_" + (re.sub(r"\W", "_", non_terminal.strip("<>")) or "symbol")
+    while name in used:
+        name += "_"
+    used.add(name)
+    return name
+
+
+def generate_descent_parser(parser, grammar_hash: str) -> str:
+    """
+    Generates the source of a recursive-descent parser.
+    :param parser: A Parser with its compiled table.
+    :param grammar_hash: The hash of the grammar, written to the module.
+    :return: The source of the module.
+    """
+    # Imported here because src.parser imports this module
+    from src.parser import AVANCA_ACTION, DESEMPILHA_ACTION, MULTIPLE_DERIVATIONS, NO_DERIVATION
+
+    used = set()
+    names = [function_name(non_terminal, used) for non_terminal in parser.non_terminals]
+    # Whether the function of each non-terminal can return a function to run next
+    has_tail = [
+        any(production and production[-1] in parser.ebnf for production in parser.ebnf[non_terminal])
+        for non_terminal in parser.non_terminals
+    ]
+    # Terminals whose lexeme is not their own type
+    valued = {parser.terminal_ids[terminal] for terminal in ("identifier", "number") if terminal in parser.terminal_ids}
+    # Sets of terminal ids, shared by the branches that test the same terminals
+    constants = {}
+    # Flyweight tokens of the non-terminals and of the terminals that are their own lexeme
+    tokens = {}
+    functions = []
+
+    def token(name: str) -> str:
+        if name not in tokens:
+            tokens[name] = f"TOKEN_{len(tokens)}"
+        return tokens[name]
+
+    def constant(values: list[int]) -> str:
+        if len(values) == 1:
+            return f"== {values[0]}"
+        key = tuple(sorted(values))
+        if key not in constants:
+            constants[key] = f"SET_{len(constants)}"
+        return f"in {constants[key]}"
+
+    def symbol_lines(code: int, tail: bool, indent: str) -> list[str]:
+        if 0 <= code < parser.unknown_id:
+            name = parser.terminals[code]
+            leaf = f"Token(value(position), {name!r})" if code in valued else token(name)
+            return [
+                f"{indent}if ids[position] == {code}:",
+                f"{indent}    children.append(Node({leaf}, NO_CHILDREN, lines[position], columns[position]))",
+                f"{indent}    position += 1",
+                f"{indent}else:",
+                f"{indent}    match(children, {code}, {name!r})",
+            ]
+        if code < 0:
+            index = ~code
+            if tail:
+                return [f"{indent}return {names[index]}, children"]
+            if has_tail[index]:
+                return [f"{indent}run({names[index]}(children))"]
+            return [f"{indent}{names[index]}(children)"]
+        name = parser.unknown_symbols[code - parser.unknown_id - 1]
+        return [f"{indent}children.append(Node(Token({f'UNKNOWN SYMBOL: {name!r}'!r}, 'ERROR')))"]
+
+    for index, non_terminal in enumerate(parser.non_terminals):
+        row = parser.action_table[index * parser.table_width:(index + 1) * parser.table_width]
+        columns = {}
+        for terminal, action in enumerate(row):
+            columns.setdefault(action, []).append(terminal)
+        node = token(non_terminal)
+
+        lines = [
+            "",
+            f"    def {names[index]}(children, add_to_graph=True):",
+            f'        """{non_terminal}"""',
+            "        nonlocal position",
+            "        while True:",
+            "            lookahead = ids[position]",
+            "            line, column = lines[position], columns[position]",
+        ]
+        keyword = "if"
+        for action in sorted(action for action in columns if action >= 0):
+            codes = parser.production_codes[action]
+            lines += [
+                f"            {keyword} lookahead {constant(columns[action])}:",
+                f"                node = Node({node}, None, line, column)",
+                "                children.append(node)",
+                "                children = node.children",
+            ]
+            if not codes:
+                lines.append("                children.append(Node(EMPTY_TOKEN, NO_CHILDREN, line, column))")
+            # Codes are reversed, the last one is the first symbol of the production
+            for symbol, code in enumerate(reversed(codes)):
+                lines += symbol_lines(code, symbol == len(codes) - 1 and code < 0, " " * 16)
+            if not codes or codes[0] >= 0:
+                lines.append("                return None")
+            keyword = "elif"
+        for action, message in (
+                (MULTIPLE_DERIVATIONS, "Multiple derivations of '{}' for input '{{lookahead_type()}}'"),
+                (NO_DERIVATION, "No production for '{}' with input '{{lookahead_type()}}'")
+        ):
+            if action in columns:
+                text = message.format(non_terminal) + "{at_position(line, column)}"
+                lines += [
+                    f"            {keyword} lookahead {constant(columns[action])}:",
+                    f"                children.append(Node(Token(f{text!r}, 'ERROR'), None, line, column))",
+                    "                return None",
+                ]
+                keyword = "elif"
+        if DESEMPILHA_ACTION in columns:
+            lines += [
+                f"            {keyword} lookahead {constant(columns[DESEMPILHA_ACTION])}:",
+                "                child = Node(DESEMPILHA_TOKEN, NO_CHILDREN, line, column)",
+                f"                children.append(Node({node}, [child], line, column) if add_to_graph else child)",
+                "                return None",
+            ]
+            keyword = "elif"
+        if AVANCA_ACTION in columns:
+            # The unknown column always skips, so this is the last branch
+            indent = " " * 16 if keyword == "elif" else " " * 12
+            if keyword == "elif":
+                lines.append("            else:")
+            lines += [
+                f"{indent}child = Node(Token(value(position), 'AVANÇA'), None, line, column)",
+                f"{indent}position += 1",
+                f"{indent}children.append(Node({node}, [child], line, column) if add_to_graph else child)",
+                f"{indent}children = child.children",
+                f"{indent}add_to_graph = False",
+            ]
+        functions.append("\n".join(lines))
+
+    entry = [
+        "",
+        "    children = []",
+        *symbol_lines(parser.start_code, False, "    "),
+        "    parser.position = position",
+        "    parser.lookahead = ids[position]",
+        "    return children[0]",
+        "",
+    ]
+    return "\n".join([
+        HEADER.format(grammar_hash=grammar_hash),
+        "\n".join(f"{name} = frozenset({{{', '.join(map(str, key))}}})" for key, name in constants.items()),
+        "\n".join(f"{token_name} = shared_token({name!r}, {name!r})" for name, token_name in tokens.items()),
+        PARSE_HEADER,
+        *functions,
+        *entry,
+    ])
+
+
+def remove_stale_files(cache_dir: str, prefix: str, current: str) -> None:
+    """
+    Removes the cache files with a prefix other than the current one, such as the files of earlier grammars
+    or versions, which are never read again. Temporary files are left to the compiles writing them.
+    :param cache_dir: The cache directory.
+    :param prefix: The prefix of the files of one kind of cache.
+    :param current: The name of the file that is kept.
+    """
+    for entry in os.scandir(cache_dir):
+        if not entry.name.startswith(prefix) or entry.name == current or entry.name.endswith(".tmp"):
+            continue
+        try:
+            os.remove(entry.path)
+        except OSError:
+            # Removed by a concurrent compile
+            pass
+
+
+def load_descent_parser(parser, grammar_hash: str, cache_dir: str | None = None) -> ModuleType:
+    """
+    Loads the recursive-descent parser of a grammar, generating it if needed.
+    :param parser: A Parser with its compiled table.
+    :param grammar_hash: The hash of the grammar.
+    :param cache_dir: Directory of the generated modules, or None to generate the module in memory.
+    :return: The module, whose parse function reads the TokenStream of a Parser.
+    """
+    module_name = f"descent_parser_{grammar_hash}_{GENERATOR_VERSION}"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    if cache_dir is None:
+        module = ModuleType(module_name)
+        exec(compile(generate_descent_parser(parser, grammar_hash), module_name, "exec"), module.__dict__)
+    else:
+        path = os.path.join(cache_dir, f"{module_name}.py")
+        if not os.path.exists(path):
+            os.makedirs(cache_dir, exist_ok=True)
+            temporary_path = f"{path}.{os.getpid()}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as f:
+                f.write(generate_descent_parser(parser, grammar_hash))
+            os.replace(temporary_path, path)
+            remove_stale_files(cache_dir, "descent_parser_", f"{module_name}.py")
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    sys.modules[module_name] = module
+    return module
@@ -0,0 +1,414 @@
+"""
+Parsing tree stored in flat arrays, for very large inputs.
+
+Each node is an index into four parallel arrays: its kind, the index of its token in the TokenStream,
+its first child and its next sibling. No Python object is created per node; FlatNode is a view with
+the token/children/line/column interface of Node, built on access, so Semantic and the code generators
+read a FlatTree like a tree of Nodes.
+"""
+import hashlib
+import os
+import pickle
+from array import array
+
+import numpy as np
+
+from src.parser import (
+    AVANCA_ACTION, DESEMPILHA_ACTION, DESEMPILHA_TOKEN, EMPTY_TOKEN, MULTIPLE_DERIVATIONS, NO_DERIVATION, Node,
+    Parser, Token, at_position, grammar_hash, shared_token,
+)
+from src.scanner import TokenStream
+
+# Link of a node without a first child or a next sibling, and token index of a node without a position
+NO_NODE = -1
+# Bumped whenever the cached trees change format
+TREE_CACHE_VERSION = 1
+# Limits of the tree cache; the least recently used trees are removed first
+TREE_CACHE_MAX_ENTRIES = 64
+TREE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+TREE_CACHE_PREFIX = "parse_tree_"
+
+
+class FlatTree:
+    """
+    Nodes of a parsing tree in parallel arrays. Node 0 is the root.
+    Kinds are ids in symbols, for nodes with a fixed token, or the complement of an id in lexeme_types, for
+    terminals whose value is read from the TokenStream.
+    """
+    tokens: TokenStream
+    kinds: array
+    token_indices: array
+    first_child: array
+    next_sibling: array
+    symbols: list[Token]
+    symbol_ids: dict[int, int]
+    lexeme_types: list[str]
+    # Tokens and children replaced through the views, such as the constants folded by Semantic
+    token_overrides: dict[int, Token]
+    children_overrides: dict[int, list]
+
+    def __init__(self, tokens: TokenStream) -> None:
+        self.tokens = tokens
+        self.kinds = array("i")
+        self.token_indices = array("i")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self.symbols = []
+        self.symbol_ids = {}
+        self.lexeme_types = []
+        self.token_overrides = {}
+        self.children_overrides = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def symbol_kind(self, token: Token) -> int:
+        """
+        Returns the kind of the nodes with a token.
+        """
+        kind = self.symbol_ids.get(id(token))
+        if kind is None:
+            kind = self.symbol_ids[id(token)] = len(self.symbols)
+            self.symbols.append(token)
+        return kind
+
+    def lexeme_kind(self, type_: str) -> int:
+        """
+        Returns the kind of the nodes whose token has a type and the lexeme of their token in the TokenStream.
+        """
+        if type_ not in self.lexeme_types:
+            self.lexeme_types.append(type_)
+        return ~self.lexeme_types.index(type_)
+
+    def token(self, node: int) -> Token:
+        if node in self.token_overrides:
+            return self.token_overrides[node]
+        kind = self.kinds[node]
+        if kind >= 0:
+            return self.symbols[kind]
+        return Token(self.tokens.value(self.token_indices[node]), self.lexeme_types[~kind])
+
+    def children(self, node: int) -> list:
+        if node in self.children_overrides:
+            return self.children_overrides[node]
+        children = []
+        child = self.first_child[node]
+        while child != NO_NODE:
+            children.append(FlatNode(self, child))
+            child = self.next_sibling[child]
+        return children
+
+    def root(self) -> "FlatNode":
+        return FlatNode(self, 0)
+
+    def nbytes(self) -> int:
+        """
+        Returns the size of the node arrays in bytes.
+        """
+        buffers = (self.kinds, self.token_indices, self.first_child, self.next_sibling)
+        return sum(buffer.itemsize * len(buffer) for buffer in buffers)
+
+
+class FlatNode:
+    """
+    View of a node of a FlatTree, with the interface of Node.
+    Assigning its token or its children replaces them in the tree.
+    """
+    __slots__ = ("tree", "index")
+    tree: FlatTree
+    index: int
+
+    def __init__(self, tree: FlatTree, index: int) -> None:
+        self.tree = tree
+        self.index = index
+
+    @property
+    def token(self) -> Token:
+        return self.tree.token(self.index)
+
+    @token.setter
+    def token(self, token: Token) -> None:
+        self.tree.token_overrides[self.index] = token
+
+    @property
+    def children(self) -> list:
+        return self.tree.children(self.index)
+
+    @children.setter
+    def children(self, children: list) -> None:
+        self.tree.children_overrides[self.index] = children
+
+    @property
+    def line(self) -> int | None:
+        token_index = self.tree.token_indices[self.index]
+        return None if token_index == NO_NODE or token_index >= len(self.tree.tokens) \
+            else self.tree.tokens.lines[token_index]
+
+    @property
+    def column(self) -> int | None:
+        token_index = self.tree.token_indices[self.index]
+        return None if token_index == NO_NODE or token_index >= len(self.tree.tokens) \
+            else self.tree.tokens.columns[token_index]
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, FlatNode) and self.tree is other.tree and self.index == other.index
+
+    def __hash__(self) -> int:
+        return hash((id(self.tree), self.index))
+
+    position = Node.position
+    __repr__ = Node.__repr__
+    to_tree = Node.to_tree
+
+
+def read_flat(parser: Parser, start: str | None = None) -> FlatTree:
+    """
+    Creates the parsing tree of a Parser in flat arrays.
+    The nodes and their order are the same as the ones built by Parser.read.
+    :param parser: A Parser over a TokenStream.
+    :param start: The non-terminal to read, by default the start symbol of the grammar.
+        Reading stops once it is derived, even if there is input left.
+    :return: The tree.
+    """
+    tokens = parser.tokens
+    if tokens is None:
+        raise Exception("The flat parsing tree is built from a TokenStream")
+    tree = FlatTree(tokens)
+    kinds, token_indices = tree.kinds, tree.token_indices
+    first_child, next_sibling = tree.first_child, tree.next_sibling
+    # Last child of each node, only needed while the tree is built
+    last_child = array("i")
+
+    terminals, non_terminals = parser.terminals, parser.non_terminals
+    action_table, width = parser.action_table, parser.table_width
+    production_codes = parser.production_codes
+    base_id, unknown_id = parser.base_id, parser.unknown_id
+    count = len(tokens)
+    # Terminal id of each token, mapped in one pass since a read may only cover a few of them
+    ids = array("i")
+    ids.frombytes(np.array(parser.kind_map, dtype=np.int32)[np.frombuffer(tokens.kinds, dtype=np.uint16)].tobytes())
+    ids.append(base_id)
+    position = parser.position
+
+    # Kinds of the terminal leaves: identifiers and numbers read their lexeme from the tokens
+    terminal_kinds = [
+        tree.lexeme_kind(terminal) if terminal in ("identifier", "number") else tree.symbol_kind(shared_token(terminal, terminal))
+        for terminal in terminals
+    ]
+    non_terminal_kinds = [tree.symbol_kind(shared_token(non_terminal, non_terminal)) for non_terminal in non_terminals]
+    empty_kind = tree.symbol_kind(EMPTY_TOKEN)
+    desempilha_kind = tree.symbol_kind(DESEMPILHA_TOKEN)
+    avanca_kind = tree.lexeme_kind("AVANÇA")
+
+    def add(kind: int, token_index: int, parent: int) -> int:
+        node = len(kinds)
+        kinds.append(kind)
+        token_indices.append(token_index)
+        first_child.append(NO_NODE)
+        next_sibling.append(NO_NODE)
+        last_child.append(NO_NODE)
+        if parent != NO_NODE:
+            previous = last_child[parent]
+            if previous == NO_NODE:
+                first_child[parent] = node
+            else:
+                next_sibling[previous] = node
+            last_child[parent] = node
+        return node
+
+    def error(message: str, token_index: int, parent: int) -> None:
+        # Error tokens are not shared, each message gets its own kind
+        tree.symbols.append(Token(message, "ERROR"))
+        add(len(tree.symbols) - 1, token_index, parent)
+
+    def lookahead_type() -> str:
+        return tokens.type_(position) if position < count else terminals[base_id]
+
+    def lookahead_position() -> str:
+        return at_position(tokens.lines[position], tokens.columns[position]) if position < count else ""
+
+    start_code = parser.start_code if start is None else ~non_terminals.index(start)
+    stack = [(start_code, NO_NODE, True)]
+    while stack:
+        code, parent, add_to_graph = stack.pop()
+        lookahead = ids[position]
+
+        # If symbol is terminal
+        if 0 <= code < unknown_id:
+            if code == lookahead:
+                add(terminal_kinds[code], position, parent)
+                position += 1
+            elif lookahead == base_id:
+                error(f"Input ended while expecting '{terminals[code]}'", NO_NODE, parent)
+            else:
+                # Avança: the skipped token holds whatever is read next for the same symbol
+                if add_to_graph:
+                    parent = add(tree.symbol_kind(shared_token(terminals[code], terminals[code])), position, parent)
+                child = add(avanca_kind, position, parent)
+                position += 1
+                stack.append((code, child, False))
+            continue
+
+        # If symbol is non-terminal
+        if code < 0:
+            action = action_table[~code * width + lookahead]
+            if action >= 0:
+                node = add(non_terminal_kinds[~code], position, parent)
+                codes = production_codes[action]
+                if not codes:
+                    add(empty_kind, position, node)
+                for symbol in codes:
+                    stack.append((symbol, node, True))
+                continue
+
+            if action == MULTIPLE_DERIVATIONS:
+                error(
+                    f"Multiple derivations of '{non_terminals[~code]}' for input '{lookahead_type()}'{lookahead_position()}",
+                    position, parent
+                )
+                continue
+
+            if action == NO_DERIVATION:
+                error(
+                    f"No production for '{non_terminals[~code]}' with input '{lookahead_type()}'{lookahead_position()}",
+                    position, parent
+                )
+                continue
+
+            if add_to_graph:
+                parent = add(non_terminal_kinds[~code], position, parent)
+            if action == DESEMPILHA_ACTION:
+                add(desempilha_kind, position, parent)
+            elif action == AVANCA_ACTION:
+                child = add(avanca_kind, position, parent)
+                position += 1
+                stack.append((code, child, False))
+            continue
+
+        error(f"UNKNOWN SYMBOL: '{parser.unknown_symbols[code - unknown_id - 1]}'", NO_NODE, parent)
+
+    parser.position = position
+    parser.lookahead = ids[position]
+    return tree
+
+
+def is_clean(tree: FlatTree) -> bool:
+    """
+    Returns whether a flat tree has no error or recovery nodes.
+    """
+    kinds = np.frombuffer(tree.kinds, dtype=np.int32)
+    recovery = [tree.lexeme_kind("AVANÇA")]
+    recovery += [kind for kind, token in enumerate(tree.symbols) if token.type_ in ("ERROR", "DESEMPILHA")]
+    return not np.isin(kinds, recovery).any()
+
+
+def offset_links(links: np.ndarray, offset: int) -> np.ndarray:
+    return np.where(links == NO_NODE, NO_NODE, links + offset)
+
+
+def tree_key(parser: Parser) -> str:
+    """
+    Hashes the grammar of a Parser and its TokenStream, which together determine the parsing tree.
+    """
+    tokens = parser.tokens
+    digest = hashlib.sha256(f"{grammar_hash(parser.ebnf, parser.terminal_list)} {TREE_CACHE_VERSION}".encode("ascii"))
+    for buffer in (tokens.kinds, tokens.starts, tokens.ends):
+        digest.update(buffer)
+    # Byte streams keep the undecoded source
+    digest.update(tokens.source.encode("utf-8", "surrogatepass") if isinstance(tokens.source, str) else tokens.source)
+    return digest.hexdigest()[:32]
+
+
+def tree_cache_path(cache_dir: str, parser: Parser) -> str:
+    """
+    The cache file of the tree a Parser reads. The version is part of the name, so stale files are found
+    without reading them.
+    """
+    return os.path.join(cache_dir, f"{TREE_CACHE_PREFIX}{TREE_CACHE_VERSION}_{tree_key(parser)}.pickle")
+
+
+def save_tree(tree: FlatTree, path: str) -> None:
+    """
+    Saves the arrays and the symbols of a FlatTree, without its tokens.
+    The file is replaced atomically, so concurrent compiles never read a partial tree.
+    :param path: The cache file.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as f:
+        pickle.dump(
+            (
+                TREE_CACHE_VERSION,
+                [(token.value, token.type_) for token in tree.symbols],
+                tree.lexeme_types,
+                tree.kinds.tobytes(),
+                tree.token_indices.tobytes(),
+                tree.first_child.tobytes(),
+                tree.next_sibling.tobytes(),
+            ),
+            f,
+            protocol=pickle.HIGHEST_PROTOCOL
+        )
+    os.replace(temporary_path, path)
+    evict_trees(os.path.dirname(path) or ".")
+
+
+def evict_trees(cache_dir: str) -> None:
+    """
+    Removes the cached trees of other versions, then the least recently used ones until the cache is within
+    TREE_CACHE_MAX_ENTRIES and TREE_CACHE_MAX_BYTES. load_tree touches the files it reads, so their
+    modification time is their last use.
+    """
+    current = f"{TREE_CACHE_PREFIX}{TREE_CACHE_VERSION}_"
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if not entry.name.startswith(TREE_CACHE_PREFIX) or not entry.name.endswith(".pickle"):
+            continue
+        try:
+            if not entry.name.startswith(current):
+                os.remove(entry.path)
+            else:
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            # Removed or replaced by a concurrent compile
+            pass
+
+    entries.sort(reverse=True)
+    total = 0
+    for count, (_, size, path) in enumerate(entries):
+        total += size
+        # The newest tree is always kept
+        if count and (count >= TREE_CACHE_MAX_ENTRIES or total > TREE_CACHE_MAX_BYTES):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def load_tree(path: str, tokens: TokenStream) -> FlatTree | None:
+    """
+    Loads a FlatTree saved by save_tree over the TokenStream it was read from.
+    :param path: The cache file.
+    :return: The tree, or None if the cache file was not found or could not be read.
+    """
+    try:
+        with open(path, "rb") as f:
+            version, symbols, lexeme_types, *buffers = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+        return None
+    if version != TREE_CACHE_VERSION:
+        return None
+    try:
+        # Marks the tree as recently used for evict_trees
+        os.utime(path)
+    except OSError:
+        pass
+    tree = FlatTree(tokens)
+    for value, type_ in symbols:
+        # Error tokens are not shared, as in read_flat
+        tree.symbol_kind(Token(value, type_) if type_ == "ERROR" else shared_token(value, type_))
+    tree.lexeme_types = lexeme_types
+    for name, data in zip(("kinds", "token_indices", "first_child", "next_sibling"), buffers):
+        getattr(tree, name).frombytes(data)
+    return tree
@@ -0,0 +1,171 @@
+"""
+Incremental reparsing of a parsing tree after an edit of its tokens.
+
+The statements, methods and classes of a program are the elements of right-recursive lists (<LCMD>,
+<LMETODO>, <LCLASSE>). The parser reaches the first token of an element with the same stack whatever comes
+after it, so when an edit falls inside an element, only that element is read again, from its non-terminal,
+and every node outside it is kept. The new element must end where the old one ended (shifted by the
+edit) without errors; otherwise the next enclosing element is tried, and finally the whole program.
+
+The trees are flat (see src/flat_tree.py): nodes hold token indices instead of positions, and the nodes of
+an element are contiguous, so the element is replaced and the later token indices are shifted with a few
+array operations, whether or not the edit adds or removes lines.
+"""
+from array import array
+
+import numpy as np
+
+from src.flat_tree import NO_NODE, FlatTree, is_clean, offset_links, read_flat
+from src.parser import Parser, shared_token
+from src.scanner import TokenStream, rescan
+
+# Non-terminals read again on their own, innermost first
+LIST_ELEMENTS = ("<CMD>", "<METODO>", "<CLASSE>")
+
+
+def splice(tree: FlatTree, begin: int, end: int, element: FlatTree, delta: int) -> None:
+    """
+    Replaces the nodes from begin to end (exclusive), a whole subtree, by the nodes of another tree.
+    :param delta: The number of tokens added before the nodes after end.
+    """
+    kinds, token_indices, first_child, next_sibling = (
+        np.frombuffer(values, dtype=np.int32)
+        for values in (tree.kinds, tree.token_indices, tree.first_child, tree.next_sibling)
+    )
+    shift = len(element) - (end - begin)
+
+    # The kinds of the element, as kinds of the tree. The maps end with a dummy entry, so they are never empty.
+    symbol_map = np.array([tree.symbol_kind(token) for token in element.symbols] + [0], dtype=np.int32)
+    lexeme_map = np.array([tree.lexeme_kind(type_) for type_ in element.lexeme_types] + [0], dtype=np.int32)
+    element_kinds = np.frombuffer(element.kinds, dtype=np.int32)
+    element_kinds = np.where(
+        element_kinds >= 0,
+        symbol_map[np.where(element_kinds >= 0, element_kinds, 0)],
+        lexeme_map[np.where(element_kinds < 0, ~element_kinds, 0)]
+    )
+
+    element_next = offset_links(np.frombuffer(element.next_sibling, dtype=np.int32), begin)
+    # The root of the element keeps the next sibling of the old one
+    element_next[0] = NO_NODE if next_sibling[begin] == NO_NODE else next_sibling[begin] + shift
+
+    after_indices = token_indices[end:]
+    parts = {
+        "kinds": (kinds[:begin], element_kinds, kinds[end:]),
+        "token_indices": (
+            token_indices[:begin],
+            np.frombuffer(element.token_indices, dtype=np.int32),
+            np.where(after_indices == NO_NODE, NO_NODE, after_indices + delta),
+        ),
+        # Links before the element only point after it, or to its root
+        "first_child": (
+            np.where(first_child[:begin] >= end, first_child[:begin] + shift, first_child[:begin]),
+            offset_links(np.frombuffer(element.first_child, dtype=np.int32), begin),
+            offset_links(first_child[end:], shift),
+        ),
+        "next_sibling": (
+            np.where(next_sibling[:begin] >= end, next_sibling[:begin] + shift, next_sibling[:begin]),
+            element_next,
+            offset_links(next_sibling[end:], shift),
+        ),
+    }
+    for name, values in parts.items():
+        merged = array("i")
+        merged.frombytes(np.concatenate(values).astype(np.int32, copy=False).tobytes())
+        setattr(tree, name, merged)
+
+
+def reparse(parser: Parser, tree: FlatTree, old_tokens: TokenStream, edit: tuple[int, int, int]) -> FlatTree:
+    """
+    Creates the parsing tree of edited tokens from the tree of the tokens before the edit.
+    The tree reads the same as the one read_flat creates from the new tokens.
+    :param parser: A Parser over the new tokens.
+    :param tree: The tree of the old tokens, read without syntax errors. It is updated in place when the edit
+        falls inside a statement, method or class and no node was replaced through its views.
+    :param old_tokens: The tokens before the edit.
+    :param edit: The tokens old_tokens[start:old_end], replaced by new_tokens[start:new_end], as (start, old_end, new_end).
+    :return: The tree of the new tokens.
+    """
+    new_tokens = parser.tokens
+    start, old_end, new_end = edit
+    token_indices, first_child, next_sibling = tree.token_indices, tree.first_child, tree.next_sibling
+
+    # Path to the last node that starts at or before the edit, with the end of each subtree.
+    # Nodes are in depth-first order, so a subtree ends at the next sibling of its root or of an ancestor.
+    path = []
+    if start < len(old_tokens) and not tree.token_overrides and not tree.children_overrides:
+        node, node_end = 0, len(tree)
+        while True:
+            path.append((node, node_end))
+            chosen = NO_NODE
+            child = first_child[node]
+            while child != NO_NODE and token_indices[child] <= start:
+                chosen = child
+                child = next_sibling[child]
+            if chosen == NO_NODE:
+                break
+            if next_sibling[chosen] != NO_NODE:
+                node_end = next_sibling[chosen]
+            node = chosen
+
+    element_kinds = {tree.symbol_kind(shared_token(element, element)): element for element in LIST_ELEMENTS}
+    for node, node_end in reversed(path[1:]):
+        if tree.kinds[node] not in element_kinds:
+            continue
+        # The next node is read with the first token after the element
+        begin = token_indices[node]
+        end = token_indices[node_end] if node_end < len(tree) else len(old_tokens)
+        # The first token of the element also decides the productions before it, so it must be kept
+        if not begin < start <= old_end <= end:
+            continue
+
+        parser.set_input(new_tokens, begin)
+        element = read_flat(parser, element_kinds[tree.kinds[node]])
+        if parser.position != end + new_end - old_end or not is_clean(element):
+            continue
+        splice(tree, node, node_end, element, new_end - old_end)
+        tree.tokens = new_tokens
+        return tree
+
+    parser.set_input(new_tokens)
+    return read_flat(parser)
+
+
+class IncrementalParser:
+    """
+    Keeps the flat parsing tree of a source up to date as it is edited.
+    Trees with syntax errors are read again from the start after each edit.
+    """
+    parser: Parser
+    tokens: TokenStream
+    tree: FlatTree
+    clean: bool
+
+    def __init__(self, parser: Parser) -> None:
+        """
+        :param parser: A Parser over a TokenStream, at the start of the input.
+        """
+        self.parser = parser
+        self.tokens = parser.tokens
+        self.tree = read_flat(parser)
+        self.clean = is_clean(self.tree)
+
+    def edit(self, offset: int, removed: int, inserted: str) -> FlatTree:
+        """
+        Applies an edit of the source and returns the new tree.
+        :param offset: The position of the edit in the source.
+        :param removed: The number of characters removed at the offset.
+        :param inserted: The text inserted at the offset.
+        """
+        tokens, start, new_end = rescan(self.tokens, offset, removed, inserted)
+        old_end = new_end - len(tokens) + len(self.tokens)
+        self.parser.set_input(tokens)
+        if self.clean:
+            tree = reparse(self.parser, self.tree, self.tokens, (start, old_end, new_end))
+        else:
+            tree = read_flat(self.parser)
+        # Elements are only replaced by elements without errors, so a tree updated in place stays clean
+        if tree is not self.tree:
+            self.clean = is_clean(tree)
+        self.tree = tree
+        self.tokens = tokens
+        return self.tree
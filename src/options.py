@@ -1,8 +1,50 @@
+def integer_argument(argv: list[str], flag: str, minimum: int) -> int:
+    """
+    Reads the integer after a flag and removes both from argv.
+    """
+    index = argv.index(flag)
+    try:
+        value = int(argv[index + 1])
+    except (IndexError, ValueError):
+        value = None
+    if value is None or value < minimum:
+        raise Exception(f"{flag} expects an integer of at least {minimum}")
+    del argv[index:index + 2]
+    return value
+
+
 class Options:
     sets: bool = False
     m_table: bool = False
     graph: bool = False
     verbose: bool = False
+    stream: bool = False
+    scan_file: bool = False
+    # Report every lexical error instead of stopping at the first one
+    all_errors: bool = False
+    # Reuse the parsing table computed by earlier runs
+    table_cache: bool = True
+    # Reuse the parsing trees of token streams read by earlier runs, stored as flat trees
+    tree_cache: bool = False
+    # Parse with the generated recursive-descent parser instead of the table driver
+    descent: bool = True
+    # Read the classes in worker processes, into a flat parsing tree
+    parallel: bool = False
+    # Leave ε and chains of single non-terminals out of the -g graphs
+    dot_collapse: bool = False
+    # Deepest level of the -g graphs, if any
+    dot_depth: int | None = None
+    # Only check the syntax, reading the parser events without building the parsing tree
+    check: bool = False
+    # Store the parsing tree in flat arrays instead of Node objects
+    flat: bool = False
+    # Build the compact abstract syntax tree and only report the declarations
+    ast: bool = False
+    # Recover from syntax errors in panic mode and report all of them, up to max_errors
+    recover: bool = False
+    max_errors: int = 20
+    # Scanner backend, see SCANNER_BACKENDS in src/scanner.py
+    lexer: str = "dfa"
     files_dir: str
 
     def __init__(
@@ -22,4 +64,51 @@ class Options:
         if "-v" in argv:
             self.verbose = True
             argv.remove("-v")
+        if "--stream" in argv:
+            self.stream = True
+            argv.remove("--stream")
+        if "-t" in argv:
+            self.scan_file = True
+            argv.remove("-t")
+        if "--all-errors" in argv:
+            self.all_errors = True
+            argv.remove("--all-errors")
+        if "--no-cache" in argv:
+            self.table_cache = False
+            argv.remove("--no-cache")
+        if "--tree-cache" in argv:
+            self.tree_cache = True
+            argv.remove("--tree-cache")
+        if "--no-descent" in argv:
+            self.descent = False
+            argv.remove("--no-descent")
+        if "--parallel" in argv:
+            self.parallel = True
+            argv.remove("--parallel")
+        if "--dot-collapse" in argv:
+            self.dot_collapse = True
+            argv.remove("--dot-collapse")
+        if "--dot-depth" in argv:
+            self.dot_depth = integer_argument(argv, "--dot-depth", 0)
+        if "--check" in argv:
+            self.check = True
+            argv.remove("--check")
+        if "--flat" in argv:
+            self.flat = True
+            argv.remove("--flat")
+        if "--ast" in argv:
+            self.ast = True
+            argv.remove("--ast")
+        if "--recover" in argv:
+            self.recover = True
+            argv.remove("--recover")
+        if "--max-errors" in argv:
+            self.recover = True
+            self.max_errors = integer_argument(argv, "--max-errors", 1)
+        if "--regex" in argv:
+            self.lexer = "regex"
+            argv.remove("--regex")
+        if "--bytes" in argv:
+            self.lexer = "bytes"
+            argv.remove("--bytes")
         self.files_dir = files_dir
@@ -0,0 +1,149 @@
+"""
+Parallel parsing of the classes of a program.
+
+After <MAIN>, a program is a right-recursive <LCLASSE> list, and each class keyword at brace depth 0
+starts an independent <CLASSE>. The classes are split into contiguous batches, which worker processes
+read from <LCLASSE> into flat trees (see src/flat_tree.py). The batches are then stitched into one
+FlatTree, replacing the empty <LCLASSE> that ends each batch with the first <LCLASSE> of the next one.
+
+Parsing a batch alone only matches the sequential parse when it has no syntax errors, because the
+recovery actions can cross class boundaries, so programs with errors are read sequentially instead.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.flat_tree import NO_NODE, FlatTree, is_clean, offset_links, read_flat
+from src.parser import Parser, shared_token
+from src.scanner import TOKEN_KINDS, TokenStream
+
+MAIN_CLASS = "<MAIN>"
+CLASS_LIST = "<LCLASSE>"
+# Batches given to each worker, so workers that finish early take more of them
+BATCHES_PER_WORKER = 4
+
+# Parser of each worker process, created by start_worker
+worker_parser: Parser | None = None
+
+
+def class_boundaries(tokens: TokenStream) -> np.ndarray:
+    """
+    Returns the indices of the class keywords outside of any braces.
+    """
+    kinds = np.frombuffer(tokens.kinds, dtype=np.uint16)
+    opens = (kinds == TOKEN_KINDS["{"]).astype(np.int64)
+    closes = (kinds == TOKEN_KINDS["}"]).astype(np.int64)
+    # Depth before each token
+    depth = np.cumsum(opens - closes) - (opens - closes)
+    return np.flatnonzero((kinds == TOKEN_KINDS["class"]) & (depth == 0))
+
+
+def start_worker(ebnf: dict[str, list[list[str]]], terminal_list: set[str], start: str, cache_dir: str | None) -> None:
+    """
+    Creates the parser of a worker process. With a cache directory, the table is the one saved by the main process.
+    """
+    global worker_parser
+    worker_parser = Parser(ebnf, TokenStream(""), start, terminal_list, cache_dir)
+
+
+def parse_batch(tokens: TokenStream) -> tuple:
+    """
+    Reads a batch of classes in a worker process.
+    :return: The arrays of its flat tree, as bytes, the value and type of its symbols, its lexeme types, and
+        whether the batch was read without errors up to its last token.
+    """
+    parser = worker_parser
+    parser.set_input(tokens)
+    tree = read_flat(parser, CLASS_LIST)
+    return (
+        tree.kinds.tobytes(),
+        tree.token_indices.tobytes(),
+        tree.first_child.tobytes(),
+        tree.next_sibling.tobytes(),
+        [(token.value, token.type_) for token in tree.symbols],
+        tree.lexeme_types,
+        parser.position == len(tokens) and is_clean(tree),
+    )
+
+
+def read_parallel(parser: Parser, workers: int | None = None) -> FlatTree | None:
+    """
+    Creates the parsing tree of a Parser over a TokenStream, reading its classes in worker processes.
+    The tree is the same as the one read_flat creates sequentially.
+    :param parser: A Parser over a TokenStream, at the start of the input.
+    :param workers: The number of worker processes, by default the number of processors.
+        Where processes are spawned instead of forked (Windows, macOS), the workers import the main module again,
+        so it must only compile under an `if __name__ == "__main__":` guard.
+    :return: The tree, or None, with the parser back at the start of the input, if the program cannot be split
+        or has syntax errors.
+    """
+    tokens = parser.tokens
+    if tokens is None or parser.position != 0 or parser.ebnf.get(parser.start) != [[MAIN_CLASS, CLASS_LIST]]:
+        return None
+    boundaries = class_boundaries(tokens)
+    if len(boundaries) < 2 or boundaries[0] != 0:
+        return None
+
+    workers = workers or os.cpu_count() or 1
+    batches = [batch for batch in np.array_split(boundaries[1:], workers * BATCHES_PER_WORKER) if len(batch)]
+    ranges = [(int(batch[0]), int(next_batch[0])) for batch, next_batch in zip(batches, batches[1:])]
+    ranges.append((int(batches[-1][0]), len(tokens)))
+
+    with ProcessPoolExecutor(
+            workers,
+            initializer=start_worker,
+            initargs=(parser.ebnf, parser.terminal_list, parser.start, parser.cache_dir)
+    ) as pool:
+        results = pool.map(parse_batch, [tokens.slice(begin, end) for begin, end in ranges])
+        # The main class is read here while the workers read the other classes
+        main = read_flat(parser, MAIN_CLASS)
+        results = list(results)
+
+    symbols = [(token.value, token.type_) for token in main.symbols]
+    if parser.position != ranges[0][0] or not is_clean(main) or any(
+            not clean or batch_symbols != symbols or lexeme_types != main.lexeme_types
+            for *_, batch_symbols, lexeme_types, clean in results
+    ):
+        parser.position = -1
+        parser.advance()
+        return None
+
+    # The root, then the main class, then each batch
+    start_kind = main.symbol_kind(shared_token(parser.start, parser.start))
+    list_kind = main.symbol_kind(shared_token(CLASS_LIST, CLASS_LIST))
+    kinds = [np.array([start_kind], dtype=np.int32), np.frombuffer(main.kinds, dtype=np.int32)]
+    token_indices = [np.array([0], dtype=np.int32), np.frombuffer(main.token_indices, dtype=np.int32)]
+    first_child = [np.array([1], dtype=np.int32), offset_links(np.frombuffer(main.first_child, dtype=np.int32), 1)]
+    next_sibling = [np.array([NO_NODE], dtype=np.int32), offset_links(np.frombuffer(main.next_sibling, dtype=np.int32), 1)]
+    offset = 1 + len(main)
+    # The main class is followed by the first <LCLASSE> of the first batch
+    next_sibling[1][0] = offset
+
+    for index, ((begin, _), result) in enumerate(zip(ranges, results)):
+        batch_kinds, batch_tokens, batch_first, batch_next = (np.frombuffer(data, dtype=np.int32) for data in result[:4])
+        batch_first = offset_links(batch_first, offset)
+        batch_next = offset_links(batch_next, offset)
+        if index < len(ranges) - 1:
+            # The last two nodes are the <LCLASSE> that derived ε at the end of the batch, and its ε.
+            # Without them, the next batch starts at the index of that <LCLASSE>, so the link to it is kept.
+            end = len(batch_kinds) - 2
+            if batch_kinds[end] != list_kind:
+                raise Exception(f"The batch at token {begin} does not end with an empty {CLASS_LIST}")
+            batch_kinds, batch_tokens, batch_first, batch_next = (
+                values[:end] for values in (batch_kinds, batch_tokens, batch_first, batch_next))
+        kinds.append(batch_kinds)
+        token_indices.append(batch_tokens + begin)
+        first_child.append(batch_first)
+        next_sibling.append(batch_next)
+        offset += len(batch_kinds)
+
+    tree = FlatTree(tokens)
+    tree.symbols, tree.symbol_ids, tree.lexeme_types = main.symbols, main.symbol_ids, main.lexeme_types
+    for name, parts in (
+            ("kinds", kinds), ("token_indices", token_indices), ("first_child", first_child), ("next_sibling", next_sibling)
+    ):
+        getattr(tree, name).frombytes(np.concatenate(parts).astype(np.int32).tobytes())
+    parser.position = len(tokens)
+    parser.lookahead = parser.base_id
+    return tree
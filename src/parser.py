@@ -1,18 +1,48 @@
+import hashlib
 import json
+import os
+import pickle
+import sys
+from array import array
+from collections import deque
+from typing import Callable, Iterable, Iterator
+import numpy as np
 import pandas as pd
 
-import anytree as at
-import anytree.exporter as exporter
 import subprocess
 
+from src.descent import load_descent_parser, remove_stale_files
 from src.options import Options
+from src.scanner import TokenStream
 
 
 BASE_CHAR = "$"
 EMPTY_CHAR = "ε"
+# Bumped whenever the cached sets or table change format
+TABLE_CACHE_VERSION = 3
+# Negative actions of the dense parsing table; other entries are production ids
+DESEMPILHA_ACTION = -1
+AVANCA_ACTION = -2
+MULTIPLE_DERIVATIONS = -3
+NO_DERIVATION = -4
+# Directory, inside the files directory, where the parsing tables are cached
+TABLE_CACHE_DIR = ".cache"
+# Events of Parser.read_events
+ENTER_EVENT = "enter"
+EXIT_EVENT = "exit"
+TOKEN_EVENT = "token"
+# Tokens that end statements, blocks and classes, where Parser.read_recovering resumes after an error
+SYNC_TOKENS = (";", "}", "class")
+# Default budget of Parser.read_recovering
+MAX_SYNTAX_ERRORS = 20
+MAX_SKIPPED_TOKENS = 1000
 
 
 class Token:
+    """
+    A token of the parsing tree. Tokens are shared between nodes (see shared_token), so they are never changed.
+    """
+    __slots__ = ("type_", "value")
     type_: str
     value: str
 
@@ -27,15 +57,27 @@ class Token:
 
 
 class Node:
+    __slots__ = ("token", "children", "line", "column")
     token: Token
-    children: list
-    result: str | None
+    # Leaves of the parser share NO_CHILDREN instead of an empty list each
+    children: list | tuple
+    # Position of the token (or of the first token of the derivation) in the program, if known
+    line: int | None
+    column: int | None
 
-    def __init__(self, token: Token, children=None):
+    def __init__(self, token: Token, children=None, line: int | None = None, column: int | None = None):
         self.token = token
         if children is None:
             children = []
         self.children = children
+        self.line = line
+        self.column = column
+
+    def position(self) -> str:
+        """
+        Describes the position of the node in the program, for error messages.
+        """
+        return at_position(self.line, self.column)
 
     def __repr__(self) -> str:
         return f"{self.token}"
@@ -47,97 +89,363 @@ class Node:
         return text
 
 
-
+NO_CHILDREN = ()
+# Flyweight tokens of the fixed vocabulary, by value and type
+SHARED_TOKENS: dict[tuple[str, str], Token] = {}
+
+
+def shared_token(value: str, type_: str) -> Token:
+    """
+    Returns the token with a value and a type, creating it the first time.
+    Keywords, punctuation, non-terminals, ε and DESEMPILHA are the same few tokens over the whole tree, so the
+    nodes share them instead of allocating a token each. Only for tokens of the grammar, so the table stays
+    bounded; see leaf_token for tokens read from the input.
+    """
+    token = SHARED_TOKENS.get((value, type_))
+    if token is None:
+        token = SHARED_TOKENS[value, type_] = Token(value, type_)
+    return token
+
+
+def leaf_token(value: str, type_: str) -> Token:
+    """
+    Returns the token of a lexeme read from the input. Keywords and punctuation, whose value is their type,
+    are shared; identifiers, numbers and other values of the program get a token each.
+    """
+    if value == type_:
+        return shared_token(value, type_)
+    return Token(value, type_)
+
+
+END_TOKEN = shared_token(BASE_CHAR, BASE_CHAR)
+EMPTY_TOKEN = shared_token(EMPTY_CHAR, EMPTY_CHAR)
+DESEMPILHA_TOKEN = shared_token("DESEMPILHA", "DESEMPILHA")
+
+
+def at_position(line: int | None, column: int | None) -> str:
+    """
+    Describes a position in the program for error messages, or returns an empty string if it is not known.
+    """
+    if line is None:
+        return ""
+    return f" at line {line}, column {column}"
+
+
+class SyntaxDiagnostic:
+    """
+    A syntax error found by Parser.read_recovering.
+    """
+    message: str
+    line: int | None
+    column: int | None
+    # Terminals that could have been read instead
+    expected: list[str]
+
+    def __init__(self, message: str, line: int | None, column: int | None, expected: list[str]) -> None:
+        self.message = message
+        self.line = line
+        self.column = column
+        self.expected = expected
+
+    def __str__(self) -> str:
+        return f"{self.message}{at_position(self.line, self.column)}"
+
+
+class SyntaxErrors(Exception):
+    """
+    Every syntax error of a program, found in a single recovering parse.
+    The partial parsing tree is kept, so later stages can still run for diagnostics.
+    """
+    diagnostics: list[SyntaxDiagnostic]
+    # Where the parse stopped because its budget ran out, which is not an error of its own
+    stopped: SyntaxDiagnostic | None
+    tree: "Node"
+
+    def __init__(self, diagnostics: list[SyntaxDiagnostic], stopped: SyntaxDiagnostic | None, tree: "Node") -> None:
+        def describe(diagnostic: SyntaxDiagnostic) -> str:
+            if diagnostic.line is None:
+                return f"fim do programa: {diagnostic.message}"
+            return f"linha {diagnostic.line}, coluna {diagnostic.column}: {diagnostic.message}"
+
+        lines = [f"  {describe(diagnostic)}" for diagnostic in diagnostics]
+        if stopped is not None:
+            lines.append(f"Análise interrompida, {describe(stopped)}")
+        super().__init__(f"{len(diagnostics)} erro(s) sintático(s) no programa:\n" + "\n".join(lines))
+        self.diagnostics = diagnostics
+        self.stopped = stopped
+        self.tree = tree
+
+
+def grammar_hash(ebnf: dict[str, list[list[str]]], terminal_list: set[str]) -> str:
+    """
+    Hashes a grammar and its terminals, so cached parsing tables are invalidated whenever the grammar changes.
+    """
+    grammar = json.dumps([ebnf, sorted(terminal_list), TABLE_CACHE_VERSION], ensure_ascii=False)
+    return hashlib.sha256(grammar.encode("utf-8")).hexdigest()[:16]
+
+
+def propagate_sets(sets: dict[str, set], includes: dict[str, list[str]]) -> None:
+    """
+    Adds to each set every set it includes, directly or transitively (DeRemer and Pennello's digraph algorithm).
+    Each strongly connected component of the inclusion graph is closed once, so every edge is followed once.
+    :param sets: The initial sets, updated in place.
+    :param includes: For each key, the keys whose sets are included in its set.
+    """
+    done = sys.maxsize
+    depth = dict.fromkeys(sets, 0)
+    stack = []
+    for root in sets:
+        if depth[root]:
+            continue
+        stack.append(root)
+        depth[root] = len(stack)
+        # The traversal is iterative, since inclusion chains can be longer than the recursion limit
+        frames = [(root, iter(includes[root]), len(stack))]
+        while frames:
+            key, children, key_depth = frames[-1]
+            for child in children:
+                if depth[child] == 0:
+                    stack.append(child)
+                    depth[child] = len(stack)
+                    frames.append((child, iter(includes[child]), len(stack)))
+                    break
+                depth[key] = min(depth[key], depth[child])
+                sets[key] |= sets[child]
+            else:
+                frames.pop()
+                if depth[key] == key_depth:
+                    # key is the first visited member of its component, which now has its final set
+                    while True:
+                        member = stack.pop()
+                        depth[member] = done
+                        if member == key:
+                            break
+                        sets[member] = set(sets[key])
+                if frames:
+                    parent = frames[-1][0]
+                    depth[parent] = min(depth[parent], depth[key])
+                    sets[parent] |= sets[key]
 
 
 class Parser:
     ebnf: dict[str, list[list[str]]]
     first: dict[str, set[str | None]]
     follow: dict[str, set[str | None]]
-    input_: list[Token]
-    parser: list[str]
+    # Input tokens are consumed lazily, one lookahead token at a time.
+    # The input is either an iterator of Token objects or a TokenStream read by position.
+    input_: Iterator[Token] | None
+    tokens: TokenStream | None
+    position: int
+    current: Token
+    current_position: tuple[int | None, int | None]
+    # Terminal id of the lookahead token
+    lookahead: int
+    # Symbol codes still to be read, top last, each with the children list its node goes to
+    # and whether it is added to the tree as its own node
+    parser: list[tuple[int, list, bool]]
     start: str
     terminal_list: set[str]
+    # Directory of the cached tables and generated parsers, if any
+    cache_dir: str | None
+    # Terminals indexed by their integer id, followed by the base character and by unknown token types
+    terminals: list[str]
+    terminal_ids: dict[str, int]
+    base_id: int
+    unknown_id: int
+    # Token stream kinds mapped to terminal ids
+    kind_map: list[int]
     # Parsing table with non-terminals as rows and terminals as columns
     # Each cell contains a list of tuples containing the non-terminal and the production
     table: dict[str, dict[str, list[
         tuple[str, list[str]]
     ]]]
+    # Compiled table: one row of actions per non-terminal id, one column per terminal id plus the unknown column
+    non_terminals: list[str]
+    productions: list[tuple[str, list[str]]]
+    # Grammar symbols of each production, reversed, as codes: terminal ids, ~id for non-terminals,
+    # and ids after unknown_id for symbols that are neither
+    production_codes: list[list[int]]
+    unknown_symbols: list[str]
+    start_code: int
+    action_table: array
+    table_width: int
+    # Whether each terminal synchronizes each non-terminal after an error, with the layout of action_table
+    sync_table: bytearray
+    # Syntax errors found by read_recovering, and where it stopped if its budget ran out
+    diagnostics: list[SyntaxDiagnostic]
+    stopped: SyntaxDiagnostic | None
 
     def __init__(
         self,
         ebnf: dict[str, list[list[str]]],
-        input_: list[Token],
+        input_: Iterable[Token] | TokenStream,
         start: str,
-        terminal_list: set[str]
+        terminal_list: set[str],
+        cache_dir: str | None = None
     ) -> None:
         self.ebnf = ebnf
         self.terminal_list = terminal_list
         self.start = start
+        self.cache_dir = cache_dir
+
+        self.terminals = [*sorted(terminal_list), BASE_CHAR]
+        self.terminal_ids = {terminal: i for i, terminal in enumerate(self.terminals)}
+        self.base_id = self.terminal_ids[BASE_CHAR]
+        self.unknown_id = len(self.terminals)
+
+        if isinstance(input_, TokenStream):
+            self.input_ = None
+            self.tokens = input_
+            self.tokens.locate()
+            self.kind_map = [self.terminal_ids.get(type_, self.unknown_id) for type_ in input_.types]
+        else:
+            self.input_ = iter(input_)
+            self.tokens = None
+        self.position = -1
+        self.advance()
+        self.parser = []
+
+        # The sets and the table only depend on the grammar, so they are reused between runs
+        cache_path = None
+        if cache_dir is not None:
+            cache_path = os.path.join(cache_dir, f"parser_tables_{grammar_hash(ebnf, terminal_list)}.pickle")
+        if cache_path is None or not self.load_tables(cache_path):
+            self.create_first()
+            self.create_follow()
+            self.create_table()
+            if cache_path is not None:
+                self.save_tables(cache_path)
+        self.compile_table()
+
+    def load_tables(self, path: str) -> bool:
+        """
+        Loads the First and Follow sets and the parsing table computed by an earlier run.
+        :param path: The cache file.
+        :return: Whether the cache file was found and could be read.
+        """
+        try:
+            with open(path, "rb") as f:
+                version, self.first, self.follow, self.table = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return False
+        return version == TABLE_CACHE_VERSION
+
+    def save_tables(self, path: str) -> None:
+        """
+        Saves the First and Follow sets and the parsing table for the next runs, removing the tables of
+        other grammars. The file is replaced atomically, so concurrent compiles never read a partial cache.
+        :param path: The cache file.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as f:
+            pickle.dump(
+                (TABLE_CACHE_VERSION, self.first, self.follow, self.table),
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(temporary_path, path)
+        remove_stale_files(os.path.dirname(path) or ".", "parser_tables_", os.path.basename(path))
+
+    def advance(self) -> None:
+        """
+        Moves the lookahead to the next input token, or to the base character once the input is over.
+        """
+        if self.tokens is not None:
+            self.position += 1
+            if self.position < len(self.tokens):
+                self.lookahead = self.kind_map[self.tokens.kinds[self.position]]
+            else:
+                self.lookahead = self.base_id
+        else:
+            # Input items are Token objects, (value, type) pairs or (value, type, line, column) tuples
+            item = next(self.input_, END_TOKEN)
+            if isinstance(item, Token):
+                self.current = item
+                self.current_position = (None, None)
+            elif item[1] == "identifier":
+                self.current = Token(sys.intern(item[0]), item[1])
+                self.current_position = (item[2], item[3]) if len(item) > 2 else (None, None)
+            else:
+                self.current = leaf_token(item[0], item[1])
+                self.current_position = (item[2], item[3]) if len(item) > 2 else (None, None)
+            self.lookahead = self.terminal_ids.get(self.current.type_, self.unknown_id)
 
-        self.input_ = [*input_, Token(BASE_CHAR, BASE_CHAR)]
-        self.parser = [self.start, Token(BASE_CHAR, BASE_CHAR)]
+    def lookahead_token(self) -> tuple[str, str]:
+        """
+        Returns the value and the type of the lookahead token.
+        Lexemes from a TokenStream are only materialized here.
+        """
+        if self.tokens is not None:
+            if self.position < len(self.tokens):
+                return self.tokens.value(self.position), self.tokens.type_(self.position)
+            return BASE_CHAR, BASE_CHAR
+        return self.current.value, self.current.type_
 
-        self.create_first()
-        self.create_follow()
-        self.create_table()
-        self.create_table()
+    def lookahead_position(self) -> tuple[int | None, int | None]:
+        """
+        Returns the line and the column of the lookahead token, or None if they are not known.
+        """
+        if self.tokens is not None:
+            if self.position < len(self.tokens):
+                return self.tokens.lines[self.position], self.tokens.columns[self.position]
+            return None, None
+        return self.current_position
 
     def create_first(self) -> None:
         """
         Creates the *First* set for each non-terminal token in the EBNF.
+        The nullable non-terminals are found first with a worklist, and then the terminals that start
+        each non-terminal are propagated once over the graph of non-terminals that can start its productions.
         """
 
-        first_set = {token: set() for token in self.ebnf.keys()}
+        ebnf = self.ebnf
+
+        # Non-terminals that derive epsilon.
+        # Each production counts its symbols not yet known to derive epsilon.
+        nullable = set()
+        remaining = {}
+        occurrences = {non_terminal: [] for non_terminal in ebnf}
+        worklist = deque()
+        for non_terminal, productions in ebnf.items():
+            for index, production in enumerate(productions):
+                if not all(token in ebnf for token in production):
+                    continue
+                remaining[non_terminal, index] = len(production)
+                for token in production:
+                    occurrences[token].append((non_terminal, index))
+                if len(production) == 0 and non_terminal not in nullable:
+                    nullable.add(non_terminal)
+                    worklist.append(non_terminal)
+        while worklist:
+            token = worklist.popleft()
+            for key in occurrences[token]:
+                remaining[key] -= 1
+                if remaining[key] == 0 and key[0] not in nullable:
+                    nullable.add(key[0])
+                    worklist.append(key[0])
+
+        # Terminals that start each non-terminal directly, and the non-terminals whose First set
+        # is included in another one: A -> B C x includes First(B), and First(C) when B derives epsilon
+        first_set = {non_terminal: set() for non_terminal in ebnf}
+        includes = {non_terminal: [] for non_terminal in ebnf}
+        for non_terminal, productions in ebnf.items():
+            for production in productions:
+                for token in production:
+                    if token not in ebnf:
+                        first_set[non_terminal].add(token)
+                        break
+                    includes[non_terminal].append(token)
+                    if token not in nullable:
+                        break
+        propagate_sets(first_set, includes)
+
+        for non_terminal in nullable:
+            first_set[non_terminal].add(None)
 
         for terminal in self.terminal_list:
             first_set[terminal] = {terminal}
 
-        def derives_epsilon(token: str) -> bool:
-            """
-            Checks if the token *first* value can reach *Epsilon*.
-
-            :param token: Non-terminal token.
-            :return: True if token *first* value can reach *Epsilon*.
-            """
-
-            return None in first_set[token]
-
-        def add_to_first(target: str, source: set[str | None]) -> bool:
-            """
-            Adds a value in the *First* set if it's not duplicated.
-
-            :param target: The new *first* value.
-            :param source: The *First* set for the value to be added.
-            :return: True if the value has been added.
-            """
-
-            initial_size = len(first_set[target])
-            first_set[target].update(source)
-            return len(first_set[target]) > initial_size
-
-        changed = True
-        while changed:
-            changed = False
-            for non_terminal, productions in self.ebnf.items():
-                for production in productions:
-                    skip = False
-                    for token in production:
-                        if not skip:
-                            if token in self.terminal_list or token not in self.ebnf:
-                                changed |= add_to_first(non_terminal, {token})
-                                skip = True
-                            else:
-                                changed |= add_to_first(
-                                    non_terminal, first_set[token])
-                                changed |= add_to_first(
-                                    non_terminal, first_set[token])
-                                if not derives_epsilon(token):
-                                    skip = True
-                    else:
-                        if len(production) == 0 or not skip:
-                            changed |= add_to_first(non_terminal, {None})
-
         self.first = first_set
 
     def subset_first(self, subset: list[str]) -> set[str | None]:
@@ -162,70 +470,56 @@ class Parser:
 
         return result
 
+    def create_suffix_first(self) -> None:
+        """
+        Computes, once, the *First* set of every suffix of every production.
+        suffix_first[non_terminal][i][j] is the *First* set of production i from its j-th token on,
+        including None if that suffix can derive epsilon.
+        """
+        epsilon = {None}
+        suffix_first = {}
+        for non_terminal, productions in self.ebnf.items():
+            rows = []
+            for production in productions:
+                row = [epsilon]
+                for token in reversed(production):
+                    token_first = self.first[token] if token in self.first else {token}
+                    if None in token_first:
+                        row.append((token_first - epsilon) | row[-1])
+                    else:
+                        row.append(token_first)
+                row.reverse()
+                rows.append(row)
+            suffix_first[non_terminal] = rows
+        self.suffix_first = suffix_first
+
     def create_follow(self) -> None:
         """
         Creates the *Follow* set for each non-terminal token in the EBNF.
+        For A -> α B β, Follow(B) gets First(β) from the precomputed suffix sets, and Follow(A) is
+        propagated to Follow(B) over the inclusion graph when β derives epsilon.
         """
 
+        self.create_suffix_first()
         follow_set = {token: set() for token in self.ebnf.keys()}
         # The start token always follows the base character.
-        # The start token always follows the base character.
         follow_set[self.start].add(BASE_CHAR)
 
-        def add_to_follow(target: str, source: set[str | None]) -> bool:
-            """
-            Adds a value in the *Follow* set if it's not duplicated.
-
-            :param target: The new *follow* value.
-            :param source: The *Follow* set for the values to be added.
-            :return: True if the value has been added.
-            """
-
-            initial_size = len(follow_set[target])
-            follow_set[target].update(source)
-            return len(follow_set[target]) > initial_size
-
-        changed = True
-        while changed:
-            changed = False
-            for non_terminal, productions in self.ebnf.items():
-                for production in productions:
-                    # trailer = follow_set[non_terminal].copy()
-                    # trailer = follow_set[non_terminal].copy()
-
-                    # for token in reversed(production):
-                    #     if token in self.ebnf:
-                    #         changed |= add_to_follow(token, trailer)
-
-                    #         if None in self.first[token]:
-                    #             trailer.update(self.first[token] - {None})
-                    #         else:
-                    #             trailer = self.first[token]
-                    #     else:
-                    #         trailer = {token}
-
-                    for i, token in enumerate(production):
-                        if token in self.ebnf:
-                            # Add the first of the next token to the follow of the current token
-                            # except for epsilon
-                            if i < len(production) - 1:
-                                subset = self.subset_first(production[i + 1:])
-                                
-                                changed |= add_to_follow(
-                                    token, self.subset_first(
-                                        production[i + 1:]) - {None}
-                                )
-                                
-                                # if("else" in subset) and (token == "<CMDELSE>"):
-                                #     print(f"    Else adicionado ao follow de {token} porque else esta no first de {production[i + 1:]}")
-                                #     print(f"        Caso encontrado analisando as produções de {non_terminal}")
-                            # If last token in production, add follow of non-terminal to the current token
-                            # or if the next token can derive epsilon, add follow of non-terminal to the current token
-                            if i == len(production) - 1 or (None in self.subset_first(production[i + 1:])):
-                                changed |= add_to_follow(
-                                    token, follow_set[non_terminal]
-                                )
-                                
+        # Non-terminals whose Follow set is included in the Follow set of another one
+        includes = {non_terminal: [] for non_terminal in self.ebnf}
+        for non_terminal, productions in self.ebnf.items():
+            for production, suffixes in zip(productions, self.suffix_first[non_terminal]):
+                for i, token in enumerate(production):
+                    if token in self.ebnf:
+                        # Add the first of the next tokens to the follow of the current token, except for epsilon
+                        follow_set[token].update(suffixes[i + 1])
+                        # If the next tokens can derive epsilon, the follow of the non-terminal follows the token
+                        if None in suffixes[i + 1]:
+                            includes[token].append(non_terminal)
+        for follow in follow_set.values():
+            follow.discard(None)
+        propagate_sets(follow_set, includes)
+
         self.follow = follow_set
 
     def create_table(self) -> None:
@@ -236,8 +530,8 @@ class Parser:
         # For each production for that particular non-terminal
         for A, productions in self.ebnf.items():
             # For each terminal in the first of the non-terminal, add the production to table[non_terminal][terminal]
-            for alpha in productions:
-                first_of_alpha = self.subset_first(alpha)
+            for alpha, suffixes in zip(productions, self.suffix_first[A]):
+                first_of_alpha = suffixes[0]
                 A_alpha = (A, alpha)
                 for a in first_of_alpha - {None}:
                     table[A][a].append(
@@ -262,108 +556,523 @@ class Parser:
 
         self.table = table
 
-    def read(self, level: int = 0, add_to_graph: bool = True) -> Node:
+    def compile_table(self) -> None:
         """
-        Creates the parsing tree by reading the input and the parser stacks.
+        Compiles the parsing table into a flat array of actions indexed by non-terminal and terminal ids,
+        so the driver never hashes a symbol.
         """
-        current_parser = self.parser.pop(0)
-        current_input = self.input_[0].type_
-        current_value = self.input_[0].value
-
-        # If symbol is the stack base
-        if current_parser == BASE_CHAR:
-            if current_input == BASE_CHAR:
-                return Node(Token("Finished parsing", "SUCCESS"))
-            else:
-                return Node(Token("Input not fully consumed", "ERROR"))
-
-        # If symbol is terminal
-        if current_parser in self.terminal_list:
-            # If symbol matches input
-            if current_parser == current_input:
-                self.input_.pop(0)
-                if current_value == current_input:
-                    return Node(Token(current_value, current_parser))
-                return Node(Token(current_value, current_parser))
-            else:
-                # Avança
-                node = Node(Token(current_parser, current_parser))
-                self.parser.insert(0, current_parser)
-                self.input_.pop(0)
-                child = Node(Token(current_value, "AVANÇA"))
-                child.children = [self.read(level + 1, False)]
-                node.children = [child]
-                if not add_to_graph:
-                    node = child
-                return node
-
-        # If symbol is non-terminal
-        if current_parser in self.ebnf:
-            derivations = self.table[current_parser][current_input]
-
-            # If EBNF is not LL(1)
-            if len(derivations) > 1:
-                return Node(Token(f"Multiple derivations of '{current_parser}' for input '{current_input}'", "ERROR"))
-
-            if not derivations:
-                return Node(Token(f"No production for '{current_parser}' with input '{current_input}'", "ERROR"))
-
-            if derivations[0][0] == "ERROR":
-                node = Node(Token(current_parser, current_parser))
-                child = Node(Token("", ""))
-                if derivations[0][1][0] == "DESEMPILHA":
-                    child = Node(Token(f"DESEMPILHA", "DESEMPILHA"))
-                elif derivations[0][1][0] == "AVANÇA":
-                    self.parser.insert(0, current_parser)
-                    self.input_.pop(0)
-                    child = Node(Token(current_value, "AVANÇA"))
-                    child.children = [self.read(level + 1, False)]
+        self.non_terminals = list(self.ebnf)
+        non_terminal_ids = {non_terminal: i for i, non_terminal in enumerate(self.non_terminals)}
+        self.productions = []
+        self.production_codes = []
+        self.unknown_symbols = []
+        production_ids = {}
+
+        def symbol_code(symbol: str) -> int:
+            if symbol in self.terminal_ids:
+                return self.terminal_ids[symbol]
+            if symbol in non_terminal_ids:
+                return ~non_terminal_ids[symbol]
+            if symbol not in self.unknown_symbols:
+                self.unknown_symbols.append(symbol)
+            return self.unknown_id + 1 + self.unknown_symbols.index(symbol)
+
+        def action(cell: list[tuple[str, list[str]]]) -> int:
+            if len(cell) > 1:
+                return MULTIPLE_DERIVATIONS
+            if not cell:
+                return NO_DERIVATION
+            non_terminal, production = cell[0]
+            if non_terminal == "ERROR":
+                if production[0] == "DESEMPILHA":
+                    return DESEMPILHA_ACTION
+                if production[0] == "AVANÇA":
+                    return AVANCA_ACTION
+                raise Exception(f"Unknown error action in the parsing table: {production}")
+            key = id(production)
+            if key not in production_ids:
+                production_ids[key] = len(self.productions)
+                self.productions.append((non_terminal, production))
+                self.production_codes.append([symbol_code(symbol) for symbol in reversed(production)])
+            return production_ids[key]
+
+        self.start_code = symbol_code(self.start)
+        # Unknown token types are skipped
+        self.table_width = self.unknown_id + 1
+        self.action_table = array("h")
+        for non_terminal in self.non_terminals:
+            row = self.table[non_terminal]
+            self.action_table.extend(action(row[terminal]) for terminal in self.terminals)
+            self.action_table.append(AVANCA_ACTION)
+
+        # The synchronizing tokens of a non-terminal are the ones of SYNC_TOKENS in its Follow set, or its whole
+        # Follow set if it has none of them, and the end of the input
+        self.sync_table = bytearray()
+        for non_terminal in self.non_terminals:
+            follow = self.follow[non_terminal]
+            sync = {terminal for terminal in SYNC_TOKENS if terminal in follow} or follow
+            self.sync_table.extend(terminal in sync or terminal == BASE_CHAR for terminal in self.terminals)
+            self.sync_table.append(False)
+
+    def set_input(self, tokens: TokenStream, position: int = 0) -> None:
+        """
+        Makes the parser read a TokenStream from a position, reusing its table.
+        """
+        self.input_ = None
+        self.tokens = tokens
+        tokens.locate()
+        self.kind_map = [self.terminal_ids.get(type_, self.unknown_id) for type_ in tokens.types]
+        self.position = position - 1
+        self.advance()
+
+    def read(self, start: str | None = None) -> Node:
+        """
+        Creates the parsing tree by reading the input and the parser stack.
+        The stack holds the symbols still to be read, top last, each with the children list of the
+        node it belongs to. Nodes are appended to that list when their symbol is popped, so the tree
+        is built depth-first, left to right, without recursion.
+        :param start: The non-terminal to read, by default the start symbol of the grammar.
+            Reading stops once it is derived, even if there is input left.
+        """
+        root = []
+        self.parser = [(self.start_code if start is None else ~self.non_terminals.index(start), root, True)]
+        stack = self.parser
+        terminals, non_terminals = self.terminals, self.non_terminals
+        action_table, width = self.action_table, self.table_width
+        production_codes = self.production_codes
+        base_id, unknown_id = self.base_id, self.unknown_id
+
+        while stack:
+            code, children, add_to_graph = stack.pop()
+            lookahead = self.lookahead
+            line, column = self.lookahead_position()
+
+            # If symbol is terminal
+            if 0 <= code < unknown_id:
+                current_parser = terminals[code]
+                current_value, _ = self.lookahead_token()
+                # If symbol matches input
+                if code == lookahead:
+                    self.advance()
+                    children.append(Node(leaf_token(current_value, current_parser), NO_CHILDREN, line, column))
+                elif lookahead == base_id:
+                    children.append(Node(Token(f"Input ended while expecting '{current_parser}'", "ERROR")))
+                else:
+                    # Avança: the skipped token holds whatever is read next for the same symbol
+                    self.advance()
+                    child = Node(Token(current_value, "AVANÇA"), None, line, column)
+                    if add_to_graph:
+                        children.append(Node(shared_token(current_parser, current_parser), [child], line, column))
+                    else:
+                        children.append(child)
+                    stack.append((code, child.children, False))
+                continue
+
+            # If symbol is non-terminal
+            if code < 0:
+                current_parser = non_terminals[~code]
+                action = action_table[~code * width + lookahead]
+
+                if action >= 0:
+                    # Create non-terminal node
+                    node = Node(shared_token(current_parser, current_parser), None, line, column)
+                    children.append(node)
+                    codes = production_codes[action]
+
+                    # If production is epsilon, return epsilon node
+                    if not codes:
+                        node.children.append(Node(EMPTY_TOKEN, NO_CHILDREN, line, column))
+                    node_children = node.children
+                    for symbol in codes:
+                        stack.append((symbol, node_children, True))
+                    continue
+
+                # If EBNF is not LL(1)
+                if action == MULTIPLE_DERIVATIONS:
+                    _, current_input = self.lookahead_token()
+                    children.append(Node(Token(
+                        f"Multiple derivations of '{current_parser}' for input '{current_input}'{at_position(line, column)}",
+                        "ERROR"
+                    ), None, line, column))
+                    continue
+
+                if action == NO_DERIVATION:
+                    _, current_input = self.lookahead_token()
+                    children.append(Node(Token(
+                        f"No production for '{current_parser}' with input '{current_input}'{at_position(line, column)}",
+                        "ERROR"
+                    ), None, line, column))
+                    continue
+
+                if action == DESEMPILHA_ACTION:
+                    child = Node(DESEMPILHA_TOKEN, NO_CHILDREN, line, column)
+                else:
+                    current_value, _ = self.lookahead_token()
+                    self.advance()
+                    child = Node(Token(current_value, "AVANÇA"), None, line, column)
+                    stack.append((code, child.children, False))
+                if add_to_graph:
+                    children.append(Node(shared_token(current_parser, current_parser), [child], line, column))
                 else:
-                    child = Node(Token(f"UNKNOWN ERROR: {derivations[0][1]}", "ERROR"))
-                node.children = [child]
-                if not add_to_graph:
-                    node = child
-                return node
+                    children.append(child)
+                continue
 
-            production = derivations[0][1]
-            self.parser = production + self.parser
+            current_parser = self.unknown_symbols[code - unknown_id - 1]
+            children.append(Node(Token(f"UNKNOWN SYMBOL: '{current_parser}'", "ERROR")))
 
-            # Create non-terminal node
-            node = Node(Token(current_parser, current_parser))
-            node.children = [self.read(level + 1) for _ in production]
+        return root[0]
 
-            # If production is epsilon, return epsilon node
-            if len(production) == 0:
-                node.children = [Node(Token(EMPTY_CHAR, EMPTY_CHAR))]
+    def read_recovering(self, max_errors: int = MAX_SYNTAX_ERRORS, max_skipped: int = MAX_SKIPPED_TOKENS) -> Node:
+        """
+        Creates the parsing tree like read(), recovering from syntax errors in panic mode.
+        The errors are kept in diagnostics instead of the tree, which only holds the symbols that were read.
+        When a non-terminal has no production for the lookahead, tokens are skipped until one that starts it again
+        or one of its synchronizing tokens (see sync_table), where it is given up. A terminal that is not found
+        is taken as missing. Errors found before another token is read belong to the same cascade and are
+        not reported.
+        Reading stops at the first error or skipped token over the budget, which is then described in stopped.
+        :param max_errors: The number of errors that can be reported.
+        :param max_skipped: The number of tokens that can be skipped.
+        :return: The tree, without the symbols that were not read.
+        """
+        self.diagnostics = []
+        self.stopped = None
+        root = []
+        self.parser = [(self.start_code, root, True)]
+        stack = self.parser
+        terminals, non_terminals = self.terminals, self.non_terminals
+        action_table, sync_table, width = self.action_table, self.sync_table, self.table_width
+        production_codes = self.production_codes
+        base_id, unknown_id = self.base_id, self.unknown_id
+        skipped = 0
+        # Whether a token was read since the last error
+        recovered = True
+        # The budget that ran out, if any
+        exhausted = None
+
+        def report(message: str, expected: list[str]) -> None:
+            nonlocal recovered, exhausted
+            if recovered:
+                if len(self.diagnostics) == max_errors:
+                    exhausted = "errors"
+                    return
+                line, column = self.lookahead_position()
+                self.diagnostics.append(SyntaxDiagnostic(message, line, column, expected))
+            recovered = False
+
+        def found() -> str:
+            value, type_ = self.lookahead_token()
+            return "end of input" if type_ == BASE_CHAR else f"'{value}'"
+
+        while stack and exhausted is None:
+            code, children, _ = stack.pop()
+            lookahead = self.lookahead
+            line, column = self.lookahead_position()
+
+            # If symbol is terminal
+            if 0 <= code < unknown_id:
+                if code == lookahead:
+                    current_value, _ = self.lookahead_token()
+                    self.advance()
+                    children.append(Node(leaf_token(current_value, terminals[code]), NO_CHILDREN, line, column))
+                    recovered = True
+                else:
+                    report(f"Missing '{terminals[code]}' before {found()}", [terminals[code]])
+                continue
+
+            # If symbol is non-terminal
+            if code < 0:
+                current_parser = non_terminals[~code]
+                row = ~code * width
+                action = action_table[row + lookahead]
+
+                if action >= 0:
+                    node = Node(shared_token(current_parser, current_parser), None, line, column)
+                    children.append(node)
+                    codes = production_codes[action]
+                    if not codes:
+                        node.children.append(Node(EMPTY_TOKEN, NO_CHILDREN, line, column))
+                    node_children = node.children
+                    for symbol in codes:
+                        stack.append((symbol, node_children, True))
+                    continue
+
+                if action == MULTIPLE_DERIVATIONS:
+                    report(f"Multiple derivations of '{current_parser}' for {found()}", [])
+                    continue
+
+                expected = [terminal for i, terminal in enumerate(terminals) if action_table[row + i] >= 0]
+                report(f"Unexpected {found()} while reading {current_parser}", expected)
+                while action_table[row + self.lookahead] < 0 and not sync_table[row + self.lookahead]:
+                    if skipped == max_skipped:
+                        exhausted = "skipped tokens"
+                        break
+                    self.advance()
+                    skipped += 1
+                # Read the non-terminal again if a token that starts it was found
+                if action_table[row + self.lookahead] >= 0:
+                    stack.append((code, children, True))
+                continue
+
+            report(f"Unknown symbol '{self.unknown_symbols[code - unknown_id - 1]}'", [])
+
+        if exhausted is not None:
+            line, column = self.lookahead_position()
+            self.stopped = SyntaxDiagnostic(f"Too many {exhausted}, reading stopped", line, column, [])
+        return root[0] if root else Node(shared_token(self.start, self.start))
+
+    def read_descent(self) -> Node:
+        """
+        Creates the parsing tree with the recursive-descent parser generated from the table.
+        The tree is the same as the one built by read(). Only nested constructs use Python calls,
+        so input nested deeper than the recursion limit allows is read again by read().
+        """
+        module = load_descent_parser(self, grammar_hash(self.ebnf, self.terminal_list), self.cache_dir)
+        try:
+            return module.parse(self)
+        except RecursionError:
+            if self.tokens is None:
+                raise
+        self.position = -1
+        self.advance()
+        return self.read()
+
+    def read_events(self) -> Iterator[tuple]:
+        """
+        Reads the input like read(), reporting the tree as events instead of building it.
+        Only the prediction stack is kept, so memory does not grow with the input when it is read lazily.
+        :return: The events, in the order of the nodes of the tree:
+            (ENTER_EVENT, token, line, column) when a node with children starts,
+            (EXIT_EVENT, token) when it ends, and
+            (TOKEN_EVENT, token, line, column) for each leaf, including ε and the recovery and error nodes.
+        """
+        # Symbol codes still to be read, top last, with whether they get their own node.
+        # None codes close the node of their token.
+        stack = [(self.start_code, True)]
+        terminals, non_terminals = self.terminals, self.non_terminals
+        action_table, width = self.action_table, self.table_width
+        production_codes = self.production_codes
+        base_id, unknown_id = self.base_id, self.unknown_id
+
+        while stack:
+            code, value = stack.pop()
+            if code is None:
+                yield EXIT_EVENT, value
+                continue
+            add_to_graph = value
+            lookahead = self.lookahead
+            line, column = self.lookahead_position()
+
+            # If symbol is terminal
+            if 0 <= code < unknown_id:
+                current_parser = terminals[code]
+                if code == lookahead:
+                    current_value, _ = self.lookahead_token()
+                    self.advance()
+                    yield TOKEN_EVENT, leaf_token(current_value, current_parser), line, column
+                elif lookahead == base_id:
+                    yield TOKEN_EVENT, Token(f"Input ended while expecting '{current_parser}'", "ERROR"), None, None
+                else:
+                    # Avança: the skipped token holds whatever is read next for the same symbol
+                    current_value, _ = self.lookahead_token()
+                    self.advance()
+                    if add_to_graph:
+                        token = shared_token(current_parser, current_parser)
+                        yield ENTER_EVENT, token, line, column
+                        stack.append((None, token))
+                    token = Token(current_value, "AVANÇA")
+                    yield ENTER_EVENT, token, line, column
+                    stack.append((None, token))
+                    stack.append((code, False))
+                continue
+
+            # If symbol is non-terminal
+            if code < 0:
+                current_parser = non_terminals[~code]
+                action = action_table[~code * width + lookahead]
+
+                if action >= 0:
+                    token = shared_token(current_parser, current_parser)
+                    yield ENTER_EVENT, token, line, column
+                    stack.append((None, token))
+                    codes = production_codes[action]
+                    if not codes:
+                        yield TOKEN_EVENT, EMPTY_TOKEN, line, column
+                    for symbol in codes:
+                        stack.append((symbol, True))
+                    continue
+
+                if action == MULTIPLE_DERIVATIONS or action == NO_DERIVATION:
+                    _, current_input = self.lookahead_token()
+                    message = f"Multiple derivations of '{current_parser}' for input '{current_input}'" \
+                        if action == MULTIPLE_DERIVATIONS else f"No production for '{current_parser}' with input '{current_input}'"
+                    yield TOKEN_EVENT, Token(f"{message}{at_position(line, column)}", "ERROR"), line, column
+                    continue
+
+                if add_to_graph:
+                    token = shared_token(current_parser, current_parser)
+                    yield ENTER_EVENT, token, line, column
+                    stack.append((None, token))
+                if action == DESEMPILHA_ACTION:
+                    yield TOKEN_EVENT, DESEMPILHA_TOKEN, line, column
+                else:
+                    current_value, _ = self.lookahead_token()
+                    self.advance()
+                    token = Token(current_value, "AVANÇA")
+                    yield ENTER_EVENT, token, line, column
+                    stack.append((None, token))
+                    stack.append((code, False))
+                continue
+
+            current_parser = self.unknown_symbols[code - unknown_id - 1]
+            yield TOKEN_EVENT, Token(f"UNKNOWN SYMBOL: '{current_parser}'", "ERROR"), None, None
+
+
+def syntax_errors(events: Iterable[tuple]) -> Iterator[str]:
+    """
+    Describes the syntax errors and the recovery actions found in the events of Parser.read_events.
+    """
+    # Tokens of the open nodes, to name the symbol a DESEMPILHA gives up on
+    open_tokens = []
+    for event in events:
+        if event[0] == ENTER_EVENT:
+            _, token, line, column = event
+            if token.type_ == "AVANÇA":
+                yield f"Unexpected '{token.value}'{at_position(line, column)}"
+            open_tokens.append(token)
+        elif event[0] == EXIT_EVENT:
+            open_tokens.pop()
+        else:
+            _, token, line, column = event
+            if token.type_ == "ERROR":
+                yield token.value
+            elif token.type_ == "DESEMPILHA":
+                expected = open_tokens[-1].value if open_tokens and open_tokens[-1].type_ != "AVANÇA" else "input"
+                yield f"Missing {expected}{at_position(line, column)}"
 
-            return node
 
-        return Node(Token(f"UNKNOWN SYMBOL: '{current_parser}'", "ERROR"))
+def check_syntax(
+        options: Options,
+        ebnf: dict[str, list[list[str]]],
+        terminal_list: set[str],
+        tokens: TokenStream | Iterable[tuple[str, str]]
+) -> list[str]:
+    """
+    Checks the syntax of a program without building its parsing tree.
+    :return: The description of each syntax error, empty if the program is valid.
+    """
+    parser = Parser(
+        ebnf=ebnf,
+        start=ebnf.keys().__iter__().__next__(),
+        terminal_list=terminal_list,
+        input_=tokens,
+        cache_dir=f"{options.files_dir}{TABLE_CACHE_DIR}" if options.table_cache else None
+    )
+    return list(syntax_errors(parser.read_events()))
+
 
+EXPRESSION_TYPES = ["<EXP>","<REXP>", "<AEXP>", "<MEXP>", "<SEXP>", "<PEXP>", "<SPEXP>", "<SPEXP_>", "<SPEXP__>", "<OEXPS>", "<EXPS>", "<EXPS_>", "<NEWEXP>"]
 
-def create_graph(node: Node, parent: Node = None) -> at.Node:
-    graph_node = at.Node(node, parent)
+
+def node_color(node: Node) -> str:
+    """
+    Returns the fill color of a node of the parsing tree in the graph.
+    """
     type_ = node.token.type_
     if type_ in ["AVANÇA", "DESEMPILHA"]:
-        graph_node.color = "yellow"
+        return "yellow"
     elif type_ == "ERROR":
-        graph_node.color = "red"
-    elif type_ in ["<EXP>","<REXP>", "<AEXP>", "<MEXP>", "<SEXP>", "<PEXP>", "<SPEXP>", "<SPEXP_>", "<SPEXP__>", "<OEXPS>", "<EXPS>", "<EXPS_>", "<NEWEXP>"]:
-        graph_node.color = "lightblue"
+        return "red"
+    elif type_ in EXPRESSION_TYPES:
+        return "lightblue"
     elif type_ in ["number", "true", "false", "null"]:
-        graph_node.color = "lightgreen"
+        return "lightgreen"
     elif type_ in ["identifier", "this"]:
-        graph_node.color = "orange"
-    else:
-        graph_node.color = "white"
-
-    for child in node.children:
-        create_graph(child, graph_node)
-    return graph_node
-
-
-def node_attr(node: at.Node) -> str:
-    return f'label="{node.name}" fillcolor="{node.color}" style="filled"'
+        return "orange"
+    return "white"
+
+
+def derives_empty(node: Node) -> bool:
+    """
+    Returns whether a node is ε or a non-terminal that only derived ε.
+    """
+    return node.token.type_ == EMPTY_CHAR or bool(node.children) and all(
+        child.token.type_ == EMPTY_CHAR for child in node.children)
+
+
+def write_dot(
+        root: Node,
+        path: str,
+        color: Callable[[Node], str] = node_color,
+        collapse: bool = False,
+        max_depth: int | None = None
+) -> None:
+    """
+    Writes a tree to a Graphviz file, in the format of anytree's UniqueDotExporter.
+    The tree is walked iteratively and the nodes are streamed to the file; only the edges are kept, in two
+    integer arrays, because they are written after the nodes.
+    :param root: The root of the tree.
+    :param path: The DOT file.
+    :param color: Returns the fill color of a node.
+    :param collapse: Whether to leave out ε nodes and the non-terminals that only derived ε, and to draw each
+        chain of non-terminals with a single child as its last non-terminal.
+    :param max_depth: Depth of the deepest nodes drawn; the children of the nodes at that depth are drawn
+        as a single "..." node.
+    """
+    # Parent and node ids of each edge, nodes are numbered in preorder
+    parents = array("I")
+    children_ids = array("I")
+    count = 0
+    with open(path, "w", encoding="utf-8", buffering=1 << 20) as f:
+        f.write("digraph tree {\n")
+        stack = [(root, -1, 0)]
+        while stack:
+            node, parent, depth = stack.pop()
+            children = node.children
+            if collapse:
+                children = [child for child in children if not derives_empty(child)]
+                while len(children) == 1 and node.token.type_.startswith("<") and children[0].token.type_.startswith("<"):
+                    node = children[0]
+                    children = [child for child in node.children if not derives_empty(child)]
+
+            node_id = count
+            count += 1
+            f.write(f'    "0x{node_id:x}" [label="{node!r}" fillcolor="{color(node)}" style="filled"];\n')
+            if parent >= 0:
+                parents.append(parent)
+                children_ids.append(node_id)
+
+            if max_depth is not None and depth >= max_depth and children:
+                parents.append(node_id)
+                children_ids.append(count)
+                f.write(f'    "0x{count:x}" [label="..." fillcolor="white" style="filled"];\n')
+                count += 1
+                continue
+            for child in reversed(children):
+                stack.append((child, node_id, depth + 1))
+
+        # Edges are grouped by parent, in preorder, like the nodes
+        for index in np.argsort(np.frombuffer(parents, dtype=np.uint32), kind="stable").tolist():
+            f.write(f'    "0x{parents[index]:x}" -> "0x{children_ids[index]:x}";\n')
+        f.write("}\n")
+
+
+def render_tree(node: Node) -> Iterator[str]:
+    """
+    Renders a tree as text, one line per node, in the style of anytree's RenderTree.
+    Lines are produced on demand, without building the anytree graph.
+    """
+    # Nodes still to be rendered, top last, with the prefix of their line and of their children's lines
+    stack = [(node, "", "")]
+    while stack:
+        node, prefix, fill = stack.pop()
+        yield f"{prefix}{node!r}"
+        children = node.children
+        for index in range(len(children) - 1, -1, -1):
+            if index == len(children) - 1:
+                stack.append((children[index], fill + "└── ", fill + "    "))
+            else:
+                stack.append((children[index], fill + "├── ", fill + "│   "))
 
 
 def check_duplicate(parser: Parser) -> None:
@@ -376,27 +1085,63 @@ def check_duplicate(parser: Parser) -> None:
 def parse(
         options: Options,
         ebnf: dict[str, list[list[str]]],
-        terminal_list: set[str]
+        terminal_list: set[str],
+        tokens: TokenStream | Iterable[tuple[str, str]] | None = None
 ) -> Node:
-    with open(f"{options.files_dir}scan.txt", "r") as f:
-        tokens = [Token(*line.strip().split(" | ")) for line in f]
+    if tokens is None:
+        # Without tokens in memory, read the ones written by the scanner to scan.txt
+        with open(f"{options.files_dir}scan.txt", "r") as f:
+            return parse(options, ebnf, terminal_list, (line.strip().split(" | ") for line in f))
 
     parser = Parser(
         ebnf=ebnf,
         start=ebnf.keys().__iter__().__next__(),
         terminal_list=terminal_list,
-        input_=tokens
+        input_=tokens,
+        cache_dir=f"{options.files_dir}{TABLE_CACHE_DIR}" if options.table_cache else None
     )
 
-    result = parser.read()
+    tree = None
+    tree_path = None
+    # Flat trees are read from token streams, without the recovering mode
+    flat_input = parser.tokens is not None and not options.recover
+    if options.tree_cache and flat_input:
+        # Imported here because src.flat_tree imports this module
+        from src.flat_tree import load_tree, tree_cache_path
+        tree_path = tree_cache_path(f"{options.files_dir}{TABLE_CACHE_DIR}", parser)
+        tree = load_tree(tree_path, parser.tokens)
+        if tree is not None:
+            tree_path = None
+    if tree is None and options.parallel and flat_input:
+        # Imported here because src.parallel imports this module
+        from src.parallel import read_parallel
+        tree = read_parallel(parser)
+    # Cached trees are flat, so a tree to cache is read into flat arrays
+    if tree is None and (options.flat or tree_path is not None) and flat_input:
+        from src.flat_tree import read_flat
+        tree = read_flat(parser)
+    if tree_path is not None:
+        from src.flat_tree import save_tree
+        save_tree(tree, tree_path)
+
+    if options.recover:
+        result = parser.read_recovering(options.max_errors)
+        # A stopped parse leaves a partial tree even without a diagnostic of its own
+        if parser.diagnostics or parser.stopped is not None:
+            raise SyntaxErrors(parser.diagnostics, parser.stopped, result)
+    elif tree is not None:
+        result = tree.root()
+    # The generated parser is only used on token streams, which can be read again if it fails
+    elif options.descent and parser.tokens is not None:
+        result = parser.read_descent()
+    else:
+        result = parser.read()
 
-    # Create graph
-    graph = create_graph(result)
-    for pre, fill, node in at.RenderTree(graph):
-        # print("%s%s" % (pre, node.name))
-        pass
+    if options.verbose:
+        for line in render_tree(result):
+            print(line)
     if options.graph:
-        exporter.UniqueDotExporter(graph, nodeattrfunc=node_attr).to_dotfile(f"{options.files_dir}parsing_tree.dot")
+        write_dot(result, f"{options.files_dir}parsing_tree.dot", node_color, options.dot_collapse, options.dot_depth)
         subprocess.run(
             ["dot", f"{options.files_dir}parsing_tree.dot", "-Tpdf", "-o", f"{options.files_dir}parsing_tree.pdf"],
             check=True
@@ -1,6 +1,10 @@
-from typing import List, Tuple
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Iterator, List, TextIO, Tuple
 import re
 
+import numpy as np
+
 from src.options import Options
 
 blanks = [" ", "\n", "\t", "\r", "\f"]
@@ -34,9 +38,13 @@ terminal_symbols = [
     ";", ",", ".",
     "=",
     "==", "!=", "<", "<=", ">", ">=",
-    "&&", "+", "-", "*"
+    "&&", "+", "-", "*", "!"
 ]
 
+RESERVED_WORDS = frozenset(reserved_words)
+IDENTIFIER_PATTERN = re.compile(r"[a-zA-Z][a-zA-Z0-9_]*")
+INTEGER_NUMBER_PATTERN = re.compile(r"[0-9]+")
+
 
 def is_identifier(str) -> bool:
     """
@@ -44,7 +52,7 @@ def is_identifier(str) -> bool:
     :param str: The string to check.
     :return: True if the string is an identifier, False otherwise.
     """
-    return re.match(r"^[a-zA-Z][a-zA-Z0-9_]*$", str) is not None
+    return IDENTIFIER_PATTERN.fullmatch(str) is not None
 
 
 def is_reserved_word(str) -> bool:
@@ -53,7 +61,7 @@ def is_reserved_word(str) -> bool:
     :param str: The string to check.
     :return: True if the string is a reserved word, False otherwise.
     """
-    return str in reserved_words
+    return str in RESERVED_WORDS
 
 
 def parse_token(string) -> tuple[str, str]:
@@ -63,8 +71,11 @@ def parse_token(string) -> tuple[str, str]:
     :return: A tuple containing the token and its type.
     """
 
-    # FDA for tokens
-    pass
+    tokens = parse_program(string)
+    if len(tokens) != 1:
+        raise Exception(
+            f"Não foi possível interpretar um token no programa: {string}")
+    return tokens[0]
 
 
 def remove_comments(string) -> str:
@@ -95,7 +106,7 @@ def is_integer_number(str) -> bool:
     :param str: The string to check.
     :return: True if the string is an integer number, False otherwise.
     """
-    return re.match(r"^[0-9]+$", str) is not None
+    return INTEGER_NUMBER_PATTERN.fullmatch(str) is not None
 
 
 def unify_println(string) -> str:
@@ -112,47 +123,916 @@ def unify_println(string) -> str:
     return out_string
 
 
+class CharacterClasses(dict):
+    """
+    Translation table for str.translate that maps each character to its class in the DFA.
+    Characters without an explicit class (including non-ASCII ones) are mapped to the default class.
+    """
+
+    def __init__(self, classes: dict[int, str], default: str) -> None:
+        super().__init__(classes)
+        self.default = default
+
+    def __missing__(self, key: int) -> str:
+        return self.default
+
+
+# Tabelas do autômato (DFA) usado por parse_program
+IDENTIFIER_START = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ")
+IDENTIFIER_CHARS = IDENTIFIER_START | frozenset("0123456789_")
+DIGITS = frozenset("0123456789")
+BLANKS = frozenset(blanks)
+# Segundo caractere dos operadores de dois caracteres, indexado pelo primeiro caractere
+SYMBOL_NEXT_CHARS = {
+    symbol[0]: {other[1] for other in terminal_symbols if len(other) == 2 and other[0] == symbol[0]}
+    for symbol in terminal_symbols
+}
+SINGLE_CHAR_SYMBOLS = frozenset(symbol for symbol in terminal_symbols if len(symbol) == 1)
+PRINTLN_PARTS = ("System", "out", "println")
+# Quantidade de caracteres lidos por vez no modo de leitura em partes
+CHUNK_SIZE = 1 << 20
+# Tamanho inicial da região lida novamente por rescan, dobrado até os tokens voltarem a coincidir
+RESCAN_WINDOW = 1 << 10
+# Classes de caracteres: "a" marca caracteres de identificadores e " " marca brancos.
+# Os laços do autômato que permanecem no mesmo estado viram uma busca pela próxima mudança de classe.
+IDENTIFIER_CLASSES = CharacterClasses({ord(char): "a" for char in IDENTIFIER_CHARS}, " ")
+BLANK_CLASSES = CharacterClasses({ord(char): " " for char in blanks}, "a")
+
+# Tipos de token, indexados pelo seu código inteiro (kind)
+TOKEN_TYPES = ["identifier", "number", *reserved_words, *terminal_symbols]
+TOKEN_KINDS = {type_: kind for kind, type_ in enumerate(TOKEN_TYPES)}
+IDENTIFIER_KIND = TOKEN_KINDS["identifier"]
+NUMBER_KIND = TOKEN_KINDS["number"]
+PRINTLN_KIND = TOKEN_KINDS["System.out.println"]
+SINGLE_CHAR_KINDS = {symbol: TOKEN_KINDS[symbol] for symbol in SINGLE_CHAR_SYMBOLS}
+# Token of each kind whose lexeme is its own type, shared by every (word, type) list.
+# Identifiers and numbers are the first two kinds, the only ones with a lexeme of their own.
+FIXED_TOKENS = [(type_, type_) for type_ in TOKEN_TYPES]
+
+
+class TokenStream:
+    """
+    Compact list of tokens over a source buffer.
+    Each token is stored as its kind and its start/end offsets in parallel arrays,
+    and its lexeme is only sliced from the source when it is requested.
+    The line and column of every token are kept in two more arrays, filled by locate().
+    """
+    types: list[str]
+    source: str
+    kinds: array
+    starts: array
+    ends: array
+    # Linha do primeiro caractere do buffer e posição (relativa ao buffer) em que essa linha começa
+    first_line: int
+    first_line_start: int
+    # Linhas e colunas começam em 1. Ficam como None até locate() ser chamado.
+    lines: array | None
+    columns: array | None
+    # Each distinct identifier once, and the id in names of the identifier of every token.
+    # None until pool_names() is called.
+    names: list[str] | None
+    name_ids: array | None
+
+    def __init__(self, source: str, first_line: int = 1, first_line_start: int = 0) -> None:
+        self.types = TOKEN_TYPES
+        self.source = source
+        self.kinds = array("H")
+        self.starts = array("I")
+        self.ends = array("I")
+        self.first_line = first_line
+        self.first_line_start = first_line_start
+        self.lines = None
+        self.columns = None
+        self.names = None
+        self.name_ids = None
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, index: int) -> Tuple[str, str]:
+        return self.value(index), self.types[self.kinds[index]]
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        for index in range(len(self.kinds)):
+            yield self.value(index), self.types[self.kinds[index]]
+
+    def type_(self, index: int) -> str:
+        """
+        Returns the type of a token.
+        """
+        return self.types[self.kinds[index]]
+
+    def tuples(self) -> List[Tuple[str, str]]:
+        """
+        Returns every token as a (word, type) pair, in a single pass over the arrays.
+        Only identifiers and numbers are sliced from the source; the other tokens are shared pairs.
+        Unlike value(), identifiers are not interned: the parser interns the pairs it reads.
+        """
+        source, types = self.source, self.types
+        return [
+            FIXED_TOKENS[kind] if kind > NUMBER_KIND else (source[start:end], types[kind])
+            for kind, start, end in zip(self.kinds, self.starts, self.ends)
+        ]
+
+    def locate(self) -> None:
+        """
+        Fills the line and column arrays.
+        The scanner does not track lines; instead, the token offsets are searched in the sorted offsets
+        of the line breaks of the source, in a single vectorized pass.
+        """
+        if self.lines is not None:
+            return
+
+        lines, columns = self.offset_positions(np.array(self.starts, dtype=np.int64))
+        self.lines = array("I", lines.astype(np.uint32).tobytes())
+        self.columns = array("I", columns.astype(np.uint32).tobytes())
+
+    def offset_positions(self, offsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the lines and the columns of offsets of the source, searched in the offsets of its line breaks.
+        :param offsets: The offsets, as int64.
+        """
+        newlines = np.flatnonzero(self.character_codes() == ord("\n"))
+        # Number of line breaks before each offset
+        breaks = np.searchsorted(newlines, offsets)
+        line_starts = np.where(breaks > 0, newlines[breaks - 1] + 1, self.first_line_start) if len(newlines) \
+            else np.full(len(offsets), self.first_line_start)
+        return breaks + self.first_line, offsets - line_starts + 1
+
+    def character_codes(self) -> np.ndarray:
+        """
+        Returns the code of each character of the source as a NumPy array.
+        """
+        if self.source.isascii():
+            return np.frombuffer(self.source.encode("ascii"), dtype=np.uint8)
+        # Offsets are counted in characters, so each character must have the same width
+        return np.frombuffer(self.source.encode("utf-32-le"), dtype=np.uint32)
+
+    def position(self, index: int) -> Tuple[int, int]:
+        """
+        Returns the line and the column of a token.
+        """
+        self.locate()
+        return self.lines[index], self.columns[index]
+
+    def slice(self, begin: int, end: int) -> "TokenStream":
+        """
+        Returns the tokens from begin to end (exclusive) as a stream over their part of the source.
+        The tokens keep their lines and columns in the whole source.
+        """
+        self.locate()
+        end = min(end, len(self))
+        offset = self.starts[begin] if begin < end else 0
+        stream = type(self)(
+            self.source[offset:self.ends[end - 1]] if begin < end else self.source[:0],
+            self.lines[begin] if begin < end else self.first_line,
+            -(self.columns[begin] - 1) if begin < end else 0
+        )
+        stream.kinds = self.kinds[begin:end]
+        for name in ("starts", "ends"):
+            offsets = np.frombuffer(getattr(self, name), dtype=np.uint32)[begin:end] - np.uint32(offset)
+            setattr(stream, name, array("I", offsets.tobytes()))
+        stream.lines = self.lines[begin:end]
+        stream.columns = self.columns[begin:end]
+        return stream
+
+    def lexeme(self, start: int, end: int) -> str:
+        """
+        Returns the text of the source between two offsets.
+        """
+        return self.source[start:end]
+
+    def pool_names(self) -> None:
+        """
+        Fills the name pool. Each distinct identifier is sliced from the source once, so the tokens,
+        the trees and the symbol tables share one string per name, and the pool is freed with the stream.
+        """
+        if self.names is not None:
+            return
+
+        pool = {}
+        names = []
+        name_ids = array("I", bytes(4 * len(self.kinds)))
+        lexeme, starts, ends = self.lexeme, self.starts, self.ends
+        for index in np.flatnonzero(np.frombuffer(self.kinds, dtype=np.uint16) == IDENTIFIER_KIND).tolist():
+            name = lexeme(starts[index], ends[index])
+            name_id = pool.get(name)
+            if name_id is None:
+                name_id = pool[name] = len(names)
+                names.append(name)
+            name_ids[index] = name_id
+        self.names = names
+        self.name_ids = name_ids
+
+    def value(self, index: int) -> str:
+        """
+        Returns the lexeme of a token. Identifiers are read from the name pool and numbers are sliced
+        from the source; the other tokens are their own type.
+        """
+        kind = self.kinds[index]
+        if kind == IDENTIFIER_KIND:
+            if self.name_ids is None:
+                self.pool_names()
+            return self.names[self.name_ids[index]]
+        if kind == NUMBER_KIND:
+            return self.lexeme(self.starts[index], self.ends[index])
+        return self.types[kind]
+
+
+class ByteTokenStream(TokenStream):
+    """
+    Token stream over the raw bytes of an ASCII source, which may be a memoryview.
+    Lexemes are only decoded when they are requested.
+    """
+    source: bytes | memoryview
+
+    def slice(self, begin: int, end: int) -> "ByteTokenStream":
+        stream = super().slice(begin, end)
+        # Slices of a memoryview are views, which cannot be sent to the worker processes of read_parallel
+        stream.source = bytes(stream.source)
+        return stream
+
+    def character_codes(self) -> np.ndarray:
+        return np.frombuffer(self.source, dtype=np.uint8)
+
+    def tuples(self) -> List[Tuple[str, str]]:
+        source, types = self.source, self.types
+        return [
+            FIXED_TOKENS[kind] if kind > NUMBER_KIND else (str(source[start:end], "ascii"), types[kind])
+            for kind, start, end in zip(self.kinds, self.starts, self.ends)
+        ]
+
+    def lexeme(self, start: int, end: int) -> str:
+        return str(self.source[start:end], "ascii")
+
+
+class IncompleteToken(Exception):
+    """
+    Raised when a token or a comment reaches the end of a chunk that is not the last one of the program.
+    """
+
+
+class LexicalError(Exception):
+    """
+    A lexeme that is not a token, at an offset of the program.
+    """
+    offset: int
+    # Position where the scan can resume after the invalid lexeme
+    resume: int
+
+    def __init__(self, message: str, offset: int, resume: int) -> None:
+        super().__init__(message)
+        self.offset = offset
+        self.resume = resume
+
+
+class LexicalErrors(Exception):
+    """
+    Every lexical error of a program, found in a single recovering scan.
+    The tokens that were recognized are kept, so later stages can still run for diagnostics.
+    """
+    errors: List[LexicalError]
+    tokens: TokenStream
+
+    def __init__(self, errors: List[LexicalError], tokens: TokenStream) -> None:
+        # Every position in one pass over the source, not one count of line breaks per error
+        positions = tokens.offset_positions(np.array([error.offset for error in errors], dtype=np.int64))
+        lines = [
+            f"  linha {line}, coluna {column}: {error}"
+            for error, line, column in zip(errors, *(values.tolist() for values in positions))
+        ]
+        super().__init__(f"{len(errors)} erro(s) léxico(s) no programa:\n" + "\n".join(lines))
+        self.errors = errors
+        self.tokens = tokens
+
+
+def skip_blanks(program: str, pos: int, end: int, final: bool = True) -> int:
+    """
+    Skips blanks and comments starting at a position.
+    :param program: The program being scanned.
+    :param pos: The position to start from.
+    :param end: The position where the scan stops.
+    :param final: False if more text may follow the end position.
+    :return: The position of the next character that is not a blank nor part of a comment.
+    """
+    while pos < end:
+        char = program[pos]
+        if char in BLANKS:
+            pos += 1
+        elif char == "/" and pos + 1 < end and program[pos + 1] == "/":
+            newline = program.find("\n", pos + 2, end)
+            if newline == -1 and not final:
+                raise IncompleteToken()
+            pos = end if newline == -1 else newline + 1
+        elif char == "/" and pos + 1 < end and program[pos + 1] == "*":
+            close = program.find("*/", pos + 2, end)
+            if close == -1:
+                if not final:
+                    raise IncompleteToken()
+                raise LexicalError(
+                    f"Comentário não terminado no programa: {program[pos:pos + 20]}", pos, end)
+            pos = close + 2
+        elif char == "/" and pos + 1 == end and not final:
+            raise IncompleteToken()
+        else:
+            break
+    return pos
+
+
+def scan_println(program: str, pos: int, end: int, final: bool = True) -> int:
+    """
+    Checks if the identifier System that ends at a position continues as System.out.println.
+    Blanks and comments are allowed around the dots.
+    :param program: The program being scanned.
+    :param pos: The position right after System.
+    :param end: The position where the scan stops.
+    :param final: False if more text may follow the end position.
+    :return: The position right after println, or -1 if the compound keyword is not present.
+    """
+    for part in PRINTLN_PARTS[1:]:
+        pos = skip_blanks(program, pos, end, final)
+        if pos >= end and not final:
+            raise IncompleteToken()
+        if pos >= end or program[pos] != ".":
+            return -1
+        pos = skip_blanks(program, pos + 1, end, final)
+        if not program.startswith(part, pos, end):
+            if not final and part.startswith(program[pos:end]):
+                raise IncompleteToken()
+            return -1
+        pos += len(part)
+        if pos == end and not final:
+            raise IncompleteToken()
+        if pos < end and program[pos] in IDENTIFIER_CHARS:
+            return -1
+    return pos
+
+
+def invalid_word(program: str, pos: int) -> str:
+    """
+    Extracts the word that contains an invalid character, for error messages.
+    :param program: The program being scanned.
+    :param pos: The position of the invalid character.
+    :return: The word, delimited by blanks and terminal symbols.
+    """
+    end = pos + 1
+    while end < len(program) and program[end] not in BLANKS and program[end] not in SINGLE_CHAR_SYMBOLS:
+        end += 1
+    return program[pos:end]
+
+
+def invalid_token(program: str, pos: int) -> LexicalError:
+    """
+    Creates the error for a lexeme that is not a token.
+    :param program: The program being scanned.
+    :param pos: The position of the invalid character.
+    :return: The error, resuming the scan after the invalid word.
+    """
+    word = invalid_word(program, pos)
+    return LexicalError(f"Não foi possível interpretar um token no programa: {word}", pos, pos + len(word))
+
+
+def scan_buffer(
+        program: str,
+        final: bool = True,
+        first_line: int = 1,
+        first_line_start: int = 0,
+        errors: List[LexicalError] | None = None
+) -> tuple[TokenStream, int]:
+    """
+    Runs the DFA over a buffer in a single left-to-right pass, without any pre-processing.
+    When the buffer is not the end of the program, the scan stops before the first token or comment
+    that could continue in the next buffer.
+    :param program: The buffer to scan.
+    :param final: False if more text may follow the buffer.
+    :param first_line: The line of the first character of the buffer.
+    :param first_line_start: The offset, relative to the buffer, where that line starts.
+    :param errors: If given, lexical errors are appended to it and the scan resumes after the invalid lexeme.
+    :return: The tokens and the position where the scan stopped.
+    """
+
+    tokens = TokenStream(program, first_line, first_line_start)
+    add_kind, add_start, add_end = tokens.kinds.append, tokens.starts.append, tokens.ends.append
+    end = len(program)
+    pos = 0
+    identifier_classes = program.translate(IDENTIFIER_CLASSES)
+    blank_classes = program.translate(BLANK_CLASSES)
+    # Referências locais às tabelas do autômato, consultadas a cada token
+    blank_chars, identifier_start, digits, token_kinds = BLANKS, IDENTIFIER_START, DIGITS, TOKEN_KINDS
+    symbol_next_chars, single_char_kinds = SYMBOL_NEXT_CHARS, SINGLE_CHAR_KINDS
+
+    # O laço só é reiniciado depois de um erro léxico no modo de recuperação
+    while True:
+        try:
+            while pos < end:
+                char = program[pos]
+
+                # Brancos
+                if char in blank_chars:
+                    pos = blank_classes.find("a", pos)
+                    if pos == -1:
+                        pos = end
+
+                # Palavras reservadas e identificadores
+                elif char in identifier_start:
+                    stop = identifier_classes.find(" ", pos)
+                    if stop == -1:
+                        if not final:
+                            raise IncompleteToken()
+                        stop = end
+                    kind = token_kinds.get(program[pos:stop], IDENTIFIER_KIND)
+                    if kind == NUMBER_KIND:
+                        # "number" is a token type, not a reserved word
+                        kind = IDENTIFIER_KIND
+                    elif stop - pos == 6 and program.startswith("System", pos) \
+                            and (println := scan_println(program, stop, end, final)) != -1:
+                        kind = PRINTLN_KIND
+                        stop = println
+                    add_kind(kind)
+                    add_start(pos)
+                    add_end(stop)
+                    pos = stop
+
+                # Números
+                elif char in digits:
+                    stop = identifier_classes.find(" ", pos)
+                    if stop == -1:
+                        if not final:
+                            raise IncompleteToken()
+                        stop = end
+                    if not program[pos:stop].isdigit():
+                        raise invalid_token(program, pos)
+                    add_kind(NUMBER_KIND)
+                    add_start(pos)
+                    add_end(stop)
+                    pos = stop
+
+                # Comentários
+                elif char == "/":
+                    stop = skip_blanks(program, pos, end, final)
+                    if stop == pos:
+                        raise invalid_token(program, pos)
+                    pos = stop
+
+                # Símbolos de um ou dois caracteres
+                elif char in symbol_next_chars:
+                    if pos + 1 < end and program[pos + 1] in symbol_next_chars[char]:
+                        stop = pos + 2
+                        kind = token_kinds[program[pos:stop]]
+                    elif pos + 1 == end and symbol_next_chars[char] and not final:
+                        raise IncompleteToken()
+                    elif char in single_char_kinds:
+                        stop = pos + 1
+                        kind = single_char_kinds[char]
+                    else:
+                        raise invalid_token(program, pos)
+                    add_kind(kind)
+                    add_start(pos)
+                    add_end(stop)
+                    pos = stop
+
+                else:
+                    raise invalid_token(program, pos)
+        except IncompleteToken:
+            pass
+        except LexicalError as error:
+            if errors is None:
+                raise
+            errors.append(error)
+            pos = error.resume
+            continue
+        break
+
+    return tokens, pos
+
+
+def scan_program(program: str, recover: bool = False) -> TokenStream:
+    """
+    Scans a program from a string into a compact token stream.
+    :param program: The program to scan.
+    :param recover: Whether to skip invalid lexemes and report all of them at the end.
+    :return: The tokens. Throws an exception if a token is not recognized, or LexicalErrors with every
+        invalid lexeme and the valid tokens in recovering mode.
+    """
+
+    errors = [] if recover else None
+    tokens, _ = scan_buffer(program, errors=errors)
+    if errors:
+        raise LexicalErrors(errors, tokens)
+    return tokens
+
+
+# Tabelas do autômato para o modo de bytes, em que cada caractere é lido como um inteiro
+BYTE_IDENTIFIER_START = frozenset(map(ord, IDENTIFIER_START))
+BYTE_IDENTIFIER_CHARS = frozenset(map(ord, IDENTIFIER_CHARS))
+BYTE_DIGITS = frozenset(map(ord, DIGITS))
+BYTE_BLANKS = frozenset(map(ord, BLANKS))
+# Tipo de cada símbolo de um caractere e, para os de dois caracteres, indexado pelo primeiro e pelo segundo byte
+BYTE_SYMBOL_KINDS = {ord(symbol): TOKEN_KINDS[symbol] for symbol in SINGLE_CHAR_SYMBOLS}
+BYTE_TWO_CHAR_KINDS = {
+    ord(first): {
+        ord(symbol[1]): TOKEN_KINDS[symbol] for symbol in terminal_symbols if len(symbol) == 2 and symbol[0] == first
+    }
+    for first in SYMBOL_NEXT_CHARS
+}
+# Palavras reservadas indexadas pelo tamanho e pelo primeiro byte, sem precisar recortar a palavra lida
+RESERVED_BY_LENGTH = {}
+for word in reserved_words:
+    if word != "System.out.println":
+        RESERVED_BY_LENGTH.setdefault(len(word), {})[ord(word[0])] = (word.encode("ascii"), TOKEN_KINDS[word])
+# Sequências de caracteres de identificadores e de brancos, procuradas direto no buffer, sem cópias dele
+IDENTIFIER_BYTES_PATTERN = re.compile(rb"[0-9A-Z_a-z]*")
+BLANK_BYTES_PATTERN = re.compile(rb"[ \n\t\r\f]*")
+LINE_END_BYTES_PATTERN = re.compile(rb"\n")
+COMMENT_END_BYTES_PATTERN = re.compile(rb"\*/")
+PRINTLN_BYTE_PARTS = tuple(part.encode("ascii") for part in PRINTLN_PARTS)
+NON_ASCII_PATTERN = re.compile(rb"[\x80-\xff]")
+
+
+def check_ascii(data: bytes | memoryview) -> None:
+    """
+    Rejects a source with non-ASCII bytes, pointing at the first one.
+    :param data: The source.
+    """
+    match = NON_ASCII_PATTERN.search(data)
+    if match is None:
+        return
+    offset = match.start()
+    data = bytes(data)
+    line = data.count(b"\n", 0, offset) + 1
+    column = offset - (data.rfind(b"\n", 0, offset) + 1) + 1
+    raise Exception(
+        f"Caractere não ASCII (byte {data[offset]:#x}) no programa na linha {line}, coluna {column}")
+
+
+def starts_with(data: bytes | memoryview, prefix: bytes, pos: int) -> bool:
+    """
+    Checks if a byte source has a prefix at a position, like bytes.startswith, which memoryview lacks.
+    """
+    return data[pos:pos + len(prefix)] == prefix
+
+
+def skip_blanks_bytes(data: bytes | memoryview, pos: int, end: int) -> int:
+    """
+    Skips blanks and comments starting at a position of a byte source.
+    :param data: The source being scanned.
+    :param pos: The position to start from.
+    :param end: The position where the scan stops.
+    :return: The position of the next byte that is not a blank nor part of a comment.
+    """
+    while pos < end:
+        byte = data[pos]
+        if byte in BYTE_BLANKS:
+            pos += 1
+        elif starts_with(data, b"//", pos):
+            newline = LINE_END_BYTES_PATTERN.search(data, pos + 2)
+            pos = end if newline is None else newline.end()
+        elif starts_with(data, b"/*", pos):
+            close = COMMENT_END_BYTES_PATTERN.search(data, pos + 2)
+            if close is None:
+                raise Exception(
+                    f"Comentário não terminado no programa: {bytes(data[pos:pos + 20]).decode('ascii')}")
+            pos = close.end()
+        else:
+            break
+    return pos
+
+
+def scan_println_bytes(data: bytes | memoryview, pos: int, end: int) -> int:
+    """
+    Checks if the identifier System that ends at a position of a byte source continues as System.out.println.
+    :param data: The source being scanned.
+    :param pos: The position right after System.
+    :param end: The position where the scan stops.
+    :return: The position right after println, or -1 if the compound keyword is not present.
+    """
+    for part in PRINTLN_BYTE_PARTS[1:]:
+        pos = skip_blanks_bytes(data, pos, end)
+        if not starts_with(data, b".", pos):
+            return -1
+        pos = skip_blanks_bytes(data, pos + 1, end)
+        if not starts_with(data, part, pos):
+            return -1
+        pos += len(part)
+        if pos < end and data[pos] in BYTE_IDENTIFIER_CHARS:
+            return -1
+    return pos
+
+
+def scan_bytes(data: bytes | bytearray | memoryview) -> ByteTokenStream:
+    """
+    Scans a program from its raw bytes, without decoding it.
+    Runs the same DFA as scan_buffer, reading each character as an integer, and
+    recognizes reserved words without slicing them from the source. Runs of identifier characters
+    and blanks are matched in the buffer itself, so the source is never copied, not even a memoryview.
+    :param data: The program. Must be ASCII.
+    :return: The tokens. Throws an exception if a token is not recognized or if the program is not ASCII.
+    """
+
+    check_ascii(data)
+
+    tokens = ByteTokenStream(data)
+    add_kind, add_start, add_end = tokens.kinds.append, tokens.starts.append, tokens.ends.append
+    end = len(data)
+    pos = 0
+    # Referências locais às tabelas do autômato, consultadas a cada token
+    identifier_run, blank_run = IDENTIFIER_BYTES_PATTERN.match, BLANK_BYTES_PATTERN.match
+    blank_bytes, identifier_start, digits = BYTE_BLANKS, BYTE_IDENTIFIER_START, BYTE_DIGITS
+    symbol_kinds, two_char_kinds, reserved_by_length = BYTE_SYMBOL_KINDS, BYTE_TWO_CHAR_KINDS, RESERVED_BY_LENGTH
+    no_reserved = {}
+
+    while pos < end:
+        byte = data[pos]
+
+        # Brancos
+        if byte in blank_bytes:
+            pos = blank_run(data, pos).end()
+
+        # Palavras reservadas e identificadores
+        elif byte in identifier_start:
+            stop = identifier_run(data, pos).end()
+            kind = IDENTIFIER_KIND
+            reserved = reserved_by_length.get(stop - pos, no_reserved).get(byte)
+            if reserved is not None and data[pos:stop] == reserved[0]:
+                kind = reserved[1]
+            elif stop - pos == 6 and data[pos:stop] == PRINTLN_BYTE_PARTS[0] \
+                    and (println := scan_println_bytes(data, stop, end)) != -1:
+                kind = PRINTLN_KIND
+                stop = println
+            add_kind(kind)
+            add_start(pos)
+            add_end(stop)
+            pos = stop
+
+        # Números
+        elif byte in digits:
+            stop = identifier_run(data, pos).end()
+            if not bytes(data[pos:stop]).isdigit():
+                raise Exception(
+                    f"Não foi possível interpretar um token no programa: {invalid_word(bytes(data).decode('ascii'), pos)}")
+            add_kind(NUMBER_KIND)
+            add_start(pos)
+            add_end(stop)
+            pos = stop
+
+        # Símbolos e comentários
+        else:
+            second = data[pos + 1] if pos + 1 < end else None
+            if byte == 47 and (second == 47 or second == 42):  # "//" ou "/*"
+                pos = skip_blanks_bytes(data, pos, end)
+                continue
+            kind = two_char_kinds.get(byte, no_reserved).get(second)
+            if kind is not None:
+                stop = pos + 2
+            elif byte in symbol_kinds:
+                kind = symbol_kinds[byte]
+                stop = pos + 1
+            else:
+                raise Exception(
+                    f"Não foi possível interpretar um token no programa: {invalid_word(bytes(data).decode('ascii'), pos)}")
+            add_kind(kind)
+            add_start(pos)
+            add_end(stop)
+            pos = stop
+
+    return tokens
+
+
+# Expressão regular única do modo alternativo do scanner.
+# Cada casamento consome os brancos que antecedem um token ou comentário, e o grupo nomeado indica o que foi lido.
+# Os brancos são possessivos e os do fim do programa casam com o grupo end, senão a busca recomeçaria em cada
+# um deles e o tempo seria quadrático no número de brancos finais.
+BLANK_PATTERN = r"[ \n\t\r\f]"
+COMMENT_PATTERN = r"//[^\n]*|/\*.*?\*/"
+MASTER_PATTERN = re.compile(
+    rf"""{BLANK_PATTERN}*+(?:
+        (?P<end>\Z)
+        | (?P<comment>{COMMENT_PATTERN})
+        | (?P<open_comment>/\*)
+        | (?P<println>System(?:{BLANK_PATTERN}|{COMMENT_PATTERN})*\.(?:{BLANK_PATTERN}|{COMMENT_PATTERN})*out
+            (?:{BLANK_PATTERN}|{COMMENT_PATTERN})*\.(?:{BLANK_PATTERN}|{COMMENT_PATTERN})*println(?![a-zA-Z0-9_]))
+        | (?P<word>[a-zA-Z][a-zA-Z0-9_]*)
+        | (?P<number>[0-9][a-zA-Z0-9_]*)
+        | (?P<symbol>{"|".join(re.escape(symbol) for symbol in sorted(terminal_symbols, key=len, reverse=True))})
+        | (?P<error>[^ \n\t\r\f])
+    )""",
+    re.DOTALL | re.VERBOSE
+)
+
+
+def scan_program_regex(program: str) -> TokenStream:
+    """
+    Scans a program from a string with a single precompiled regular expression.
+    Produces the same tokens as the DFA, and is kept as an alternative backend for benchmarks.
+    :param program: The program to scan.
+    :return: The tokens. Throws an exception if a token is not recognized.
+    """
+
+    tokens = TokenStream(program)
+    add_kind, add_start, add_end = tokens.kinds.append, tokens.starts.append, tokens.ends.append
+    token_kinds = TOKEN_KINDS
+
+    for match in MASTER_PATTERN.finditer(program):
+        group = match.lastgroup
+        if group == "comment" or group == "end":
+            continue
+
+        start, stop = match.span(group)
+        if group == "word":
+            kind = token_kinds.get(match.group(group), IDENTIFIER_KIND)
+            if kind == NUMBER_KIND:
+                # "number" is a token type, not a reserved word
+                kind = IDENTIFIER_KIND
+        elif group == "symbol":
+            kind = token_kinds[match.group(group)]
+        elif group == "number":
+            if not match.group(group).isdigit():
+                raise Exception(
+                    f"Não foi possível interpretar um token no programa: {invalid_word(program, start)}")
+            kind = NUMBER_KIND
+        elif group == "println":
+            kind = PRINTLN_KIND
+        elif group == "open_comment":
+            raise Exception(
+                f"Comentário não terminado no programa: {program[start:start + 20]}")
+        else:
+            raise Exception(
+                f"Não foi possível interpretar um token no programa: {invalid_word(program, start)}")
+        add_kind(kind)
+        add_start(start)
+        add_end(stop)
+
+    return tokens
+
+
+# Implementações do scanner que podem ser escolhidas pelas opções
+SCANNER_BACKENDS = {
+    "dfa": scan_program,
+    "regex": scan_program_regex,
+    "bytes": scan_bytes,
+}
+
+
 def parse_program(program) -> List[Tuple[str, str]]:
     """
     Parses a program from a string.
     Returns a list of tokens where each token is the [word, type].
+    The program is read by a DFA in a single left-to-right pass, without any pre-processing.
     :param string: The string to parse.
     :return: The list of tokens sequentially. Throws an exception if a token is not recognized.
     """
 
-    tokenList = []
+    return scan_program(program).tuples()
+
+
+def parse_stream(file: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, str, int, int]]:
+    """
+    Parses a program from a file without reading it whole.
+    The file is read in chunks, and tokens or comments that cross a chunk boundary are kept
+    for the next chunk. Tokens are yielded as soon as their chunk is scanned.
+    :param file: The file to read the program from.
+    :param chunk_size: The number of characters read at a time.
+    :return: An iterator over the tokens, where each token is the (word, type, line, column).
+    """
 
-    # Pré-processamento
-    # Remove todos os comentários de linha
-    program = remove_comments(program)
-    program = add_spaces(program)
-    program = unify_println(program)
+    buffer = ""
+    line, line_start = 1, 0
+    while True:
+        chunk = file.read(chunk_size)
+        final = not chunk
+        buffer = buffer + chunk if buffer else chunk
+        tokens, pos = scan_buffer(buffer, final, line, line_start)
+        tokens.locate()
+        for index in range(len(tokens)):
+            yield tokens.value(index), tokens.type_(index), tokens.lines[index], tokens.columns[index]
+        if final:
+            return
+        # A próxima parte começa no token incompleto
+        newlines = buffer.count("\n", 0, pos)
+        if newlines:
+            line += newlines
+            line_start = buffer.rfind("\n", 0, pos) + 1
+        buffer = buffer[pos:]
+        line_start -= pos
 
-    for word in program.split():
-        if word in reserved_words:
-            tokenList.append((word, word))
-        elif word in terminal_symbols:
-            tokenList.append((word, word))
-        elif is_identifier(word):
-            tokenList.append((word, "identifier"))
-        elif is_integer_number(word):
-            tokenList.append((word, "number"))
+
+def rescan(tokens: TokenStream, offset: int, removed: int, inserted: str) -> tuple[TokenStream, int, int]:
+    """
+    Updates a token stream after an edit of its source, scanning again only the damaged region.
+    The scan starts a few tokens before the edit and stops at the first token that is also in the old stream,
+    at the same (shifted) position and with the same kind: from there on the DFA reads the same text
+    from its initial state, so the remaining old tokens are reused.
+    :param tokens: The tokens of the source before the edit.
+    :param offset: The position of the edit in the old source.
+    :param removed: The number of characters removed at the offset.
+    :param inserted: The text inserted at the offset.
+    :return: The tokens of the edited source and the range [first, last) of new tokens that replaced old ones.
+    """
+
+    source = tokens.source[:offset] + inserted + tokens.source[offset + removed:]
+    delta = len(inserted) - removed
+    edit_end = offset + len(inserted)
+
+    # The token that ends at the edit may grow, and System.out.println or a two-character operator
+    # may be formed with the few tokens before it
+    first = max(0, bisect_left(tokens.ends, offset) - len(PRINTLN_PARTS) - 1)
+    pos = tokens.starts[first] if first < len(tokens) else 0
+    # Old tokens entirely after the edit are the candidates for resynchronization
+    old = bisect_left(tokens.starts, offset + removed)
+
+    kinds, starts, ends = array("H"), array("I"), array("I")
+    size = RESCAN_WINDOW
+    synchronized = False
+    while not synchronized:
+        final = pos + size >= len(source)
+        window, stop = scan_buffer(source[pos:pos + size], final)
+        for index in range(len(window)):
+            start = window.starts[index] + pos
+            if start >= edit_end:
+                while old < len(tokens) and tokens.starts[old] + delta < start:
+                    old += 1
+                if old < len(tokens) and tokens.starts[old] + delta == start \
+                        and tokens.kinds[old] == window.kinds[index] and tokens.ends[old] + delta == window.ends[index] + pos:
+                    synchronized = True
+                    break
+            kinds.append(window.kinds[index])
+            starts.append(start)
+            ends.append(window.ends[index] + pos)
         else:
-            raise Exception(
-                f"Não foi possível interpretar um token no programa: {word}")
+            if final:
+                old = len(tokens)
+                break
+        pos += stop
+        size *= 2
 
-    return tokenList
+    result = TokenStream(source)
+    result.kinds = tokens.kinds[:first] + kinds + tokens.kinds[old:]
+    tail_starts = np.array(tokens.starts[old:], dtype=np.int64) + delta
+    tail_ends = np.array(tokens.ends[old:], dtype=np.int64) + delta
+    result.starts = tokens.starts[:first] + starts + array("I", tail_starts.astype(np.uint32).tobytes())
+    result.ends = tokens.ends[:first] + ends + array("I", tail_ends.astype(np.uint32).tobytes())
 
+    # The tokens scanned again before the edit are usually unchanged
+    same = 0
+    while same < len(kinds) and first + same < len(tokens) and tokens.ends[first + same] < offset \
+            and kinds[same] == tokens.kinds[first + same] and starts[same] == tokens.starts[first + same] \
+            and ends[same] == tokens.ends[first + same]:
+        same += 1
 
-def scan(options: Options) -> None:
-    token_list = []
+    return result, first + same, first + len(kinds)
 
-    # Abre o arquivo para leitura
-    with open(f"{options.files_dir}program.java", "r") as f:
-        program = f.read()
-        tokenList = parse_program(program)
 
-    with open(f"{options.files_dir}scan.txt", "w") as f:
-        for token in tokenList:
+def write_tokens(tokens: Iterable[Tuple[str, ...]], path: str) -> Iterator[Tuple[str, ...]]:
+    """
+    Writes tokens to a file as they are consumed.
+    :param tokens: The tokens to write.
+    :param path: The path of the file.
+    :return: An iterator over the same tokens.
+    """
+    with open(path, "w") as f:
+        for token in tokens:
             f.write(f"{token[0]} | {token[1]}\n")
+            yield token
+
+
+def scan(options: Options) -> TokenStream | Iterable[Tuple[str, str, int, int]]:
+    """
+    Scans program.java.
+    The tokens are handed to the parser in memory; scan.txt is only written with the -t option.
+    :param options: The compiler options.
+    :return: The tokens. In streaming mode the tokens are read lazily, as (word, type, line, column) tuples.
+        With --all-errors, raises LexicalErrors with every lexical error of the program.
+    """
+    # Only the DFA backend over the whole program recovers from lexical errors
+    if options.all_errors and options.stream:
+        raise Exception("--all-errors reads the whole program, it cannot be combined with --stream")
+    if options.all_errors and options.lexer != "dfa":
+        raise Exception(f"--all-errors is only supported by the DFA scanner, not with --{options.lexer}")
+    # Only the DFA backend reads the program in chunks
+    if options.stream and options.lexer != "dfa":
+        raise Exception(f"--stream is only supported by the DFA scanner, not with --{options.lexer}")
+
+    if options.stream:
+        # Lê o programa em partes, entregando os tokens conforme são reconhecidos
+        def read_stream() -> Iterator[Tuple[str, str, int, int]]:
+            with open(f"{options.files_dir}program.java", "r") as f:
+                yield from parse_stream(f)
+
+        tokens = read_stream()
+        if options.scan_file:
+            tokens = write_tokens(tokens, f"{options.files_dir}scan.txt")
+        return tokens
+
+    # Abre o arquivo para leitura; o modo de bytes lê o programa sem decodificá-lo
+    with open(f"{options.files_dir}program.java", "rb" if options.lexer == "bytes" else "r") as f:
+        program = f.read()
+    if options.all_errors:
+        tokens = scan_program(program, recover=True)
+    else:
+        tokens = SCANNER_BACKENDS[options.lexer](program)
+
+    if options.scan_file:
+        for _ in write_tokens(tokens, f"{options.files_dir}scan.txt"):
+            pass
 
+    return tokens
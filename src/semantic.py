@@ -1,7 +1,5 @@
-from src.parser import Node, EMPTY_CHAR, Token
+from src.parser import Node, EMPTY_CHAR, EXPRESSION_TYPES, Token, write_dot
 
-import anytree as at
-import anytree.exporter as exporter
 import subprocess
 import json
 
@@ -61,6 +59,12 @@ class ScopeManager:
                 print(f"\t{k}: {v}")
 
 
+class SemanticError(Exception):
+    """
+    Semantic error that already describes where it happened in the program.
+    """
+
+
 class Semantic:
     symbol_table = {}
 
@@ -221,7 +225,7 @@ class Semantic:
                 try:
                     inherited = self.symbol_table[clsExtends]
                 except Exception as e:
-                    raise Exception(f"Class '{clsIdentifier}' is trying to extend undeclared class '{clsExtends}'") from e
+                    raise SemanticError(f"Class '{clsIdentifier}' is trying to extend undeclared class '{clsExtends}'{cls.position()}") from e
                 for k, v in inherited["variables"].items():
                     # Check if type is valid
                     if v["type"] not in valid_types:
@@ -285,7 +289,7 @@ class Semantic:
                         resultado_return["type"] = "int"
                         
                     if resultado_return["type"] != self.symbol_table[clsIdentifier]["methods"][methodIdentifier]["type"]:
-                        raise Exception(f"Invalid return type '{resultado_return['type']}' in method '{methodIdentifier}' of class '{clsIdentifier}'")
+                        raise SemanticError(f"Invalid return type '{resultado_return['type']}' in method '{methodIdentifier}' of class '{clsIdentifier}'{methodReturnExp.position()}")
                 
                 scope_manager.exit_scope() # *Exiting method scope
                 currentMethod = currentMethod.children[1]
@@ -312,6 +316,32 @@ class Semantic:
 
 
     def analyze_command(self, command: Node, scope_manager: ScopeManager):
+        """
+        Analyzes a command, adding its position in the program to the errors raised inside it.
+        """
+        try:
+            return self.check_command(command, scope_manager)
+        except SemanticError:
+            raise
+        except Exception as e:
+            if command.line is None:
+                raise
+            raise SemanticError(f"{e}{command.position()}") from e
+
+    def analyze_expression(self, expression: Node, scope_manager: ScopeManager, other_data = None):
+        """
+        Analyzes an expression, adding its position in the program to the errors raised inside it.
+        """
+        try:
+            return self.check_expression(expression, scope_manager, other_data)
+        except SemanticError:
+            raise
+        except Exception as e:
+            if expression.line is None:
+                raise
+            raise SemanticError(f"{e}{expression.position()}") from e
+
+    def check_command(self, command: Node, scope_manager: ScopeManager):
         """
         Only checks if variables used are already declared.
         
@@ -404,7 +434,7 @@ class Semantic:
         else:
             raise Exception("Invalid command node, encountered node type: " + command.token.type_)
         
-    def analyze_expression(self, expression: Node, scope_manager: ScopeManager, other_data = None):
+    def check_expression(self, expression: Node, scope_manager: ScopeManager, other_data = None):
         if expression.token.type_ == "<EXP>":
             # EXP -> REXP EXP_
             # Retornamos o tipo e substituímos o valor e tipo do nó atual para pré calcular expressões entre constantes
@@ -1435,34 +1465,21 @@ def get_symbol_table(ast: Node):
 
 def analyze_semantics(options: Options, ast: Node):
     
-    def create_graph(node: Node, parent: Node = None) -> at.Node:
-        graph_node = at.Node(node, parent)
+    def node_color(node: Node) -> str:
         type_ = node.token.type_
         if type_ in ["<CONSTANT>", "number", "boolean", "null"]:
-            graph_node.color = "lightgreen"
+            return "lightgreen"
         elif type_ in ["identifier", "this"]:
-            graph_node.color = "orange"
-        elif type_ in ["<EXP>","<REXP>", "<AEXP>", "<MEXP>", "<SEXP>", "<PEXP>", "<SPEXP>", "<SPEXP_>", "<SPEXP__>", "<OEXPS>", "<EXPS>", "<EXPS_>", "<NEWEXP>"]:
-            graph_node.color = "lightblue"
-        else:
-            graph_node.color = "white"
-        
-        for child in node.children:
-            create_graph(child, graph_node)
-            
-        return graph_node
-        
-    
-    def node_attr(node: at.Node) -> str:
-        return f'label="{node.name}" fillcolor="{node.color}" style="filled"'
+            return "orange"
+        elif type_ in EXPRESSION_TYPES:
+            return "lightblue"
+        return "white"
     
     sem = Semantic()
     sem.semantic_analysis(ast)
     
-    graph = create_graph(ast)
-    
     if options.graph:
-        exporter.UniqueDotExporter(graph, nodeattrfunc=node_attr).to_dotfile(f"{options.files_dir}semantic_tree.dot")
+        write_dot(ast, f"{options.files_dir}semantic_tree.dot", node_color, options.dot_collapse, options.dot_depth)
         subprocess.run(
             ["dot", f"{options.files_dir}semantic_tree.dot", "-Tpdf", "-o", f"{options.files_dir}semantic_tree.pdf"],
             check=True
@@ -0,0 +1,619 @@
+"""
+Compact abstract syntax tree of MiniJava programs.
+
+build_ast reads a TokenStream and builds the typed nodes directly, with no epsilon or chain
+nodes: a literal is a single node instead of the <EXP> → <REXP> → <AEXP> → <MEXP> → <SEXP>
+chain of the concrete tree. It follows the grammar in src/gramatica.py but has no error
+recovery, so the program must be syntactically valid.
+"""
+from typing import Iterator
+
+from src.parser import at_position
+from src.scanner import IDENTIFIER_KIND, NUMBER_KIND, TOKEN_KINDS, TokenStream
+
+
+class AstNode:
+    __slots__ = ("line", "column")
+    # Attributes holding child nodes or lists of child nodes, in source order
+    fields: tuple[str, ...] = ()
+
+    def __init__(self, line: int | None, column: int | None) -> None:
+        self.line = line
+        self.column = column
+
+    def children(self) -> list["AstNode"]:
+        children = []
+        for field in self.fields:
+            value = getattr(self, field)
+            if isinstance(value, list):
+                children.extend(value)
+            elif value is not None:
+                children.append(value)
+        return children
+
+    def position(self) -> str:
+        """
+        Describes the position of the node in the program, for error messages.
+        """
+        return at_position(self.line, self.column)
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+
+# region Declarations
+
+class Program(AstNode):
+    __slots__ = ("main", "classes")
+    fields = ("main", "classes")
+
+    def __init__(self, main: "MainClass", classes: list["ClassDecl"], line: int | None, column: int | None) -> None:
+        super().__init__(line, column)
+        self.main = main
+        self.classes = classes
+
+
+class MainClass(AstNode):
+    __slots__ = ("name", "argument", "body")
+    fields = ("body",)
+
+    def __init__(self, name: str, argument: str, body: "Statement", line: int | None, column: int | None) -> None:
+        super().__init__(line, column)
+        self.name = name
+        self.argument = argument
+        self.body = body
+
+
+class ClassDecl(AstNode):
+    __slots__ = ("name", "extends", "variables", "methods")
+    fields = ("variables", "methods")
+
+    def __init__(
+        self,
+        name: str,
+        extends: str | None,
+        variables: list["VarDecl"],
+        methods: list["MethodDecl"],
+        line: int | None,
+        column: int | None
+    ) -> None:
+        super().__init__(line, column)
+        self.name = name
+        self.extends = extends
+        self.variables = variables
+        self.methods = methods
+
+
+class VarDecl(AstNode):
+    """
+    Declaration of an attribute, a parameter or a local variable.
+    The type is "int", "int[]", "boolean" or a class name, as in the symbol table.
+    """
+    __slots__ = ("type_", "name")
+
+    def __init__(self, type_: str, name: str, line: int | None, column: int | None) -> None:
+        super().__init__(line, column)
+        self.type_ = type_
+        self.name = name
+
+
+class MethodDecl(AstNode):
+    __slots__ = ("type_", "name", "params", "variables", "body", "result")
+    fields = ("params", "variables", "body", "result")
+
+    def __init__(
+        self,
+        type_: str,
+        name: str,
+        params: list[VarDecl],
+        variables: list[VarDecl],
+        body: list["Statement"],
+        result: "Expression",
+        line: int | None,
+        column: int | None
+    ) -> None:
+        super().__init__(line, column)
+        self.type_ = type_
+        self.name = name
+        self.params = params
+        self.variables = variables
+        self.body = body
+        self.result = result
+
+# endregion
+
+
+# region Statements
+
+class Statement(AstNode):
+    __slots__ = ()
+
+
+class Block(Statement):
+    __slots__ = ("statements",)
+    fields = ("statements",)
+
+    def __init__(self, statements: list[Statement], line: int | None, column: int | None) -> None:
+        super().__init__(line, column)
+        self.statements = statements
+
+
+class If(Statement):
+    __slots__ = ("condition", "then", "else_")
+    fields = ("condition", "then", "else_")
+
+    def __init__(
+        self,
+        condition: "Expression",
+        then: Statement,
+        else_: Statement | None,
+        line: int | None,
+        column: int | None
+    ) -> None:
+        super().__init__(line, column)
+        self.condition = condition
+        self.then = then
+        self.else_ = else_
+
+
+class While(Statement):
+    __slots__ = ("condition", "body")
+    fields = ("condition", "body")
+
+    def __init__(self, condition: "Expression", body: Statement, line: int | None, column: int | None) -> None:
+        super().__init__(line, column)
+        self.condition = condition
+        self.body = body
+
+
+class Print(Statement):
+    __slots__ = ("value",)
+    fields = ("value",)
+
+    def __init__(self, value: "Expression", line: int | None, column: int | None) -> None:
+        super().__init__(line, column)
+        self.value = value
+
+
+class Assign(Statement):
+    __slots__ = ("name", "value")
+    fields = ("value",)
+
+    def __init__(self, name: str, value: "Expression", line: int | None, column: int | None) -> None:
+        super().__init__(line, column)
+        self.name = name
+        self.value = value
+
+
+class ArrayAssign(Statement):
+    __slots__ = ("name", "index", "value")
+    fields = ("index", "value")
+
+    def __init__(self, name: str, index: "Expression", value: "Expression", line: int | None, column: int | None):
+        super().__init__(line, column)
+        self.name = name
+        self.index = index
+        self.value = value
+
+# endregion
+
+
+# region Expressions
+
+class Expression(AstNode):
+    __slots__ = ()
+
+
+class BinaryOp(Expression):
+    """
+    Binary operation; chains of the same precedence level are grouped to the left.
+    """
+    __slots__ = ("operator", "left", "right")
+    fields = ("left", "right")
+
+    def __init__(self, operator: str, left: Expression, right: Expression, line: int | None, column: int | None):
+        super().__init__(line, column)
+        self.operator = operator
+        self.left = left
+        self.right = right
+
+
+class UnaryOp(Expression):
+    __slots__ = ("operator", "operand")
+    fields = ("operand",)
+
+    def __init__(self, operator: str, operand: Expression, line: int | None, column: int | None) -> None:
+        super().__init__(line, column)
+        self.operator = operator
+        self.operand = operand
+
+
+class Literal(Expression):
+    """
+    Integer, boolean or null literal. The type is "int", "boolean" or "null".
+    """
+    __slots__ = ("type_", "value")
+
+    def __init__(self, type_: str, value: int | bool | None, line: int | None, column: int | None) -> None:
+        super().__init__(line, column)
+        self.type_ = type_
+        self.value = value
+
+
+class Identifier(Expression):
+    __slots__ = ("name",)
+
+    def __init__(self, name: str, line: int | None, column: int | None) -> None:
+        super().__init__(line, column)
+        self.name = name
+
+
+class This(Expression):
+    __slots__ = ()
+
+
+class NewObject(Expression):
+    __slots__ = ("class_name",)
+
+    def __init__(self, class_name: str, line: int | None, column: int | None) -> None:
+        super().__init__(line, column)
+        self.class_name = class_name
+
+
+class NewArray(Expression):
+    __slots__ = ("size",)
+    fields = ("size",)
+
+    def __init__(self, size: Expression, line: int | None, column: int | None) -> None:
+        super().__init__(line, column)
+        self.size = size
+
+
+class Index(Expression):
+    __slots__ = ("array", "index")
+    fields = ("array", "index")
+
+    def __init__(self, array: Expression, index: Expression, line: int | None, column: int | None) -> None:
+        super().__init__(line, column)
+        self.array = array
+        self.index = index
+
+
+class Length(Expression):
+    __slots__ = ("array",)
+    fields = ("array",)
+
+    def __init__(self, array: Expression, line: int | None, column: int | None) -> None:
+        super().__init__(line, column)
+        self.array = array
+
+
+class FieldAccess(Expression):
+    __slots__ = ("receiver", "name")
+    fields = ("receiver",)
+
+    def __init__(self, receiver: Expression, name: str, line: int | None, column: int | None) -> None:
+        super().__init__(line, column)
+        self.receiver = receiver
+        self.name = name
+
+
+class Call(Expression):
+    __slots__ = ("receiver", "method", "arguments")
+    fields = ("receiver", "arguments")
+
+    def __init__(
+        self,
+        receiver: Expression,
+        method: str,
+        arguments: list[Expression],
+        line: int | None,
+        column: int | None
+    ) -> None:
+        super().__init__(line, column)
+        self.receiver = receiver
+        self.method = method
+        self.arguments = arguments
+
+# endregion
+
+
+def walk(node: AstNode) -> Iterator[AstNode]:
+    """
+    Iterates over a node and all of its descendants, in source order.
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.children()))
+
+
+def count_nodes(node: AstNode) -> int:
+    return sum(1 for _ in walk(node))
+
+
+# Operators of each precedence level, from the lowest, as in <EXP>, <REXP>, <AEXP> and <MEXP>
+BINARY_LEVELS = (
+    frozenset({TOKEN_KINDS["&&"]}),
+    frozenset({TOKEN_KINDS["<"], TOKEN_KINDS["=="], TOKEN_KINDS["!="]}),
+    frozenset({TOKEN_KINDS["+"], TOKEN_KINDS["-"]}),
+    frozenset({TOKEN_KINDS["*"]}),
+)
+TYPE_START_KINDS = frozenset({TOKEN_KINDS["int"], TOKEN_KINDS["boolean"], IDENTIFIER_KIND})
+
+
+class AstBuilder:
+    tokens: TokenStream
+    kinds: list[int]
+    position: int
+
+    def __init__(self, tokens: TokenStream) -> None:
+        self.tokens = tokens
+        tokens.locate()
+        # The end of the input is read as the base character
+        self.kinds = [*tokens.kinds, -1]
+        self.position = 0
+
+    def peek(self, offset: int = 0) -> int:
+        return self.kinds[self.position + offset]
+
+    def where(self) -> tuple[int | None, int | None]:
+        if self.position < len(self.tokens):
+            return self.tokens.lines[self.position], self.tokens.columns[self.position]
+        return None, None
+
+    def accept(self, type_: str) -> bool:
+        if self.kinds[self.position] == TOKEN_KINDS[type_]:
+            self.position += 1
+            return True
+        return False
+
+    def expect(self, type_: str) -> str:
+        """
+        Reads a token of a type and returns its lexeme. Throws an exception if the next token has another type.
+        """
+        if self.kinds[self.position] != TOKEN_KINDS[type_]:
+            found = self.tokens.type_(self.position) if self.position < len(self.tokens) else "$"
+            raise Exception(f"Expected '{type_}' but found '{found}'{at_position(*self.where())}")
+        self.position += 1
+        return self.tokens.value(self.position - 1)
+
+    def program(self) -> Program:
+        line, column = self.where()
+        main = self.main_class()
+        classes = []
+        while self.peek() == TOKEN_KINDS["class"]:
+            classes.append(self.class_decl())
+        self.expect_end()
+        return Program(main, classes, line, column)
+
+    def expect_end(self) -> None:
+        if self.position < len(self.tokens):
+            raise Exception(f"Input not fully consumed{at_position(*self.where())}")
+
+    def main_class(self) -> MainClass:
+        line, column = self.where()
+        self.expect("class")
+        name = self.expect("identifier")
+        for type_ in ("{", "public", "static", "void", "main", "(", "String", "[", "]"):
+            self.expect(type_)
+        argument = self.expect("identifier")
+        self.expect(")")
+        self.expect("{")
+        body = self.statement()
+        self.expect("}")
+        self.expect("}")
+        return MainClass(name, argument, body, line, column)
+
+    def class_decl(self) -> ClassDecl:
+        line, column = self.where()
+        self.expect("class")
+        name = self.expect("identifier")
+        extends = self.expect("identifier") if self.accept("extends") else None
+        self.expect("{")
+        variables = self.var_decls()
+        methods = []
+        while self.peek() == TOKEN_KINDS["public"]:
+            methods.append(self.method_decl())
+        self.expect("}")
+        return ClassDecl(name, extends, variables, methods, line, column)
+
+    def type_(self) -> str:
+        if self.accept("int"):
+            if self.accept("["):
+                self.expect("]")
+                return "int[]"
+            return "int"
+        if self.accept("boolean"):
+            return "boolean"
+        return self.expect("identifier")
+
+    def var_decls(self) -> list[VarDecl]:
+        variables = []
+        while self.peek() in TYPE_START_KINDS:
+            line, column = self.where()
+            type_ = self.type_()
+            variables.append(VarDecl(type_, self.expect("identifier"), line, column))
+            self.expect(";")
+        return variables
+
+    def method_decl(self) -> MethodDecl:
+        line, column = self.where()
+        self.expect("public")
+        type_ = self.type_()
+        name = self.expect("identifier")
+        self.expect("(")
+        params = []
+        if self.peek() != TOKEN_KINDS[")"]:
+            while True:
+                param_line, param_column = self.where()
+                param_type = self.type_()
+                params.append(VarDecl(param_type, self.expect("identifier"), param_line, param_column))
+                if not self.accept(","):
+                    break
+        self.expect(")")
+        self.expect("{")
+        variables = self.var_decls()
+        self.expect("{")
+        body = self.statements()
+        self.expect("}")
+        self.expect("return")
+        result = self.expression()
+        self.expect(";")
+        self.expect("}")
+        return MethodDecl(type_, name, params, variables, body, result, line, column)
+
+    def statements(self) -> list[Statement]:
+        statements = []
+        while self.peek() != TOKEN_KINDS["}"] and self.position < len(self.tokens):
+            statements.append(self.statement())
+        return statements
+
+    def statement(self) -> Statement:
+        line, column = self.where()
+        if self.accept("{"):
+            statements = self.statements()
+            self.expect("}")
+            return Block(statements, line, column)
+        if self.accept("if"):
+            self.expect("(")
+            condition = self.expression()
+            self.expect(")")
+            self.expect("{")
+            then = self.statement()
+            self.expect("}")
+            else_ = None
+            if self.accept("else"):
+                self.expect("{")
+                else_ = self.statement()
+                self.expect("}")
+            return If(condition, then, else_, line, column)
+        if self.accept("while"):
+            self.expect("(")
+            condition = self.expression()
+            self.expect(")")
+            return While(condition, self.statement(), line, column)
+        if self.accept("System.out.println"):
+            self.expect("(")
+            value = self.expression()
+            self.expect(")")
+            self.expect(";")
+            return Print(value, line, column)
+        name = self.expect("identifier")
+        if self.accept("["):
+            index = self.expression()
+            self.expect("]")
+            self.expect("=")
+            value = self.expression()
+            self.expect(";")
+            return ArrayAssign(name, index, value, line, column)
+        self.expect("=")
+        value = self.expression()
+        self.expect(";")
+        return Assign(name, value, line, column)
+
+    def expression(self, level: int = 0) -> Expression:
+        if level == len(BINARY_LEVELS):
+            return self.unary()
+        line, column = self.where()
+        operators = BINARY_LEVELS[level]
+        left = self.expression(level + 1)
+        while self.peek() in operators:
+            operator = self.tokens.type_(self.position)
+            self.position += 1
+            left = BinaryOp(operator, left, self.expression(level + 1), line, column)
+        return left
+
+    def unary(self) -> Expression:
+        line, column = self.where()
+        kind = self.peek()
+        if kind == TOKEN_KINDS["!"] or kind == TOKEN_KINDS["-"]:
+            self.position += 1
+            return UnaryOp(self.tokens.type_(self.position - 1), self.unary(), line, column)
+        if self.accept("true"):
+            return Literal("boolean", True, line, column)
+        if self.accept("false"):
+            return Literal("boolean", False, line, column)
+        if kind == NUMBER_KIND:
+            return Literal("int", int(self.expect("number")), line, column)
+        if self.accept("null"):
+            return Literal("null", None, line, column)
+        if self.accept("new"):
+            if self.accept("int"):
+                self.expect("[")
+                size = self.expression()
+                self.expect("]")
+                return NewArray(size, line, column)
+            class_name = self.expect("identifier")
+            self.expect("(")
+            self.expect(")")
+            return self.postfix(NewObject(class_name, line, column))
+        if self.accept("this"):
+            return self.postfix(This(line, column))
+        if self.accept("("):
+            inner = self.expression()
+            self.expect(")")
+            return self.postfix(inner)
+        return self.postfix(Identifier(self.expect("identifier"), line, column))
+
+    def postfix(self, receiver: Expression) -> Expression:
+        """
+        Reads the accesses after a primary expression, as in <SPEXP>.
+        """
+        line, column = receiver.line, receiver.column
+        while True:
+            if self.accept("["):
+                index = self.expression()
+                self.expect("]")
+                return Index(receiver, index, line, column)
+            if not self.accept("."):
+                return receiver
+            if self.accept("length"):
+                return Length(receiver, line, column)
+            name = self.expect("identifier")
+            if self.accept("("):
+                arguments = []
+                if self.peek() != TOKEN_KINDS[")"]:
+                    arguments.append(self.expression())
+                    while self.accept(","):
+                        arguments.append(self.expression())
+                self.expect(")")
+                receiver = Call(receiver, name, arguments, line, column)
+            else:
+                receiver = FieldAccess(receiver, name, line, column)
+
+
+def build_ast(tokens: TokenStream) -> Program:
+    """
+    Builds the abstract syntax tree of a program.
+    :param tokens: The tokens of the program.
+    :return: The program node. Throws an exception on the first syntax error.
+    """
+    return AstBuilder(tokens).program()
+
+
+def collect_declarations(program: Program) -> dict:
+    """
+    Builds the symbol table of the classes of a program, as Semantic.scan_declarations does
+    from the concrete tree.
+    """
+    symbol_table = {}
+    for class_ in program.classes:
+        variables = {"this": {"type": class_.name}}
+        variables.update((variable.name, {"type": variable.type_}) for variable in class_.variables)
+        methods = {}
+        for method in class_.methods:
+            methods[method.name] = {
+                "type": method.type_,
+                "params": {param.name: {"type": param.type_} for param in method.params},
+                "variables": {variable.name: {"type": variable.type_} for variable in method.variables},
+            }
+        symbol_table[class_.name] = {
+            "type": "class",
+            "extends": class_.extends,
+            "variables": variables,
+            "methods": methods,
+        }
+    return symbol_table